@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+
+# created by Alexander Deca - Deca Consulting 06/07/2023
+# please note there is a requirements file -> pip install -r requirements.txt
+# this script checks that the fast path MAC address table parser in MacLookup.py
+# returns the same entries as ntc-templates, and measures the speed of both.
+# It uses IOS/IOS-XE and NX-OS tables of SyntheticCorpus.py and, when present, the saved
+# show mac address-table outputs in the output directory. A table the fast path falls back
+# on counts as a failure, except the tables built with an unknown line on purpose.
+# usage : python BenchMacParser.py --lines 100000 --directory output
+
+import os
+import sys
+import time
+import argparse
+from ntc_templates.parse import parse_output
+import MacLookup
+from SyntheticCorpus import generate_ios_table, generate_nxos_table
+
+
+def reference_parse(output):
+    """Parses a table with ntc-templates only, in the same format as MacLookup.parse_mac_table."""
+    if MacLookup.NXOS_HEADER_RE.search(output):
+        return [
+            {"destination_address": entry["mac"], "type": entry["type"], "vlan": entry["vlan"], "destination_port": [entry["ports"]]}
+            for entry in parse_output(platform="cisco_nxos", command="show mac address-table", data=output)
+        ]
+    return parse_output(platform="cisco_ios", command="show mac address-table", data=output)
+
+
+def timed(function, output):
+    """Returns the result of function(output) and the time it took in seconds."""
+    start = time.perf_counter()
+    try:
+        result = function(output)
+    except Exception as e:
+        result = e
+    return result, time.perf_counter() - start
+
+
+def check(name, output, fallback=False):
+    """Compares the fast path with ntc-templates for one output, returns True when they are equal.
+
+    With fallback the output is unparseable on purpose and the fast path must fall back to
+    ntc-templates, otherwise a fallback is a failure.
+    """
+    fast, fast_time = timed(MacLookup.fast_parse_mac_table, output)
+    reference, reference_time = timed(reference_parse, output)
+
+    if fallback or fast is None:
+        equal = fallback and fast is None
+        status = "fallback" if equal else "FALLBACK EXPECTED" if fallback else "UNEXPECTED FALLBACK"
+    elif isinstance(reference, Exception):
+        status = f"MISMATCH, ntc-templates failed: {reference}"
+        equal = False
+    else:
+        equal = fast == reference
+        status = "equal" if equal else "MISMATCH"
+
+    speedup = reference_time / fast_time if fast_time else 0
+    print(f"{name:<50} {fast_time * 1000:>10.1f} ms {reference_time * 1000:>10.1f} ms {speedup:>8.1f}x  {status}")
+    return equal
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Compare and benchmark the MAC address table parsers.")
+    parser.add_argument("--lines", type=int, default=100000, help="number of entries in the largest generated table")
+    parser.add_argument("--directory", default="output", help="directory with saved show mac address-table outputs")
+    args = parser.parse_args()
+
+    print(f"{'output':<50} {'fast path':>13} {'ntc-templates':>13} {'speedup':>9}")
+    results = []
+
+    for lines in sorted({10, 1000, args.lines}):
+        results.append(check(f"generated IOS table, {lines} entries", generate_ios_table(lines)))
+        results.append(check(f"generated NX-OS table, {lines} entries", generate_nxos_table(lines)))
+
+    # Tables with unknown lines must be left to ntc-templates
+    results.append(check("IOS table with an unknown line", generate_ios_table(10) + "unknown line\n", fallback=True))
+    results.append(check("NX-OS table with an unknown line", generate_nxos_table(10) + "unknown line\n", fallback=True))
+
+    for root, dirs, files in os.walk(args.directory):
+        for file in files:
+            if file.startswith("show_mac") and file.endswith(".txt"):
+                file_path = os.path.join(root, file)
+                with open(file_path, "r") as f:
+                    output = f.read()
+                # Failed commands are saved as an error message, not a table
+                if not output.startswith("Error executing command"):
+                    results.append(check(file_path[-50:], output))
+
+    if not all(results):
+        print("The fast path parser does not match ntc-templates for all outputs.")
+        sys.exit(1)
+    print("The fast path parser matches ntc-templates for all outputs.")
+
+if __name__ == "__main__":
+    main()
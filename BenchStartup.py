@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+# created by Alexander Deca - Deca Consulting 06/07/2023
+# please note there is a requirements file -> pip install -r requirements.txt
+# this script measures the cold start of netaudit.py: the wall time of
+# netaudit.py <subcommand> --help in a new interpreter, and the heavy libraries
+# that were imported. A subcommand over the budget or importing a heavy library
+# for --help fails the check, so the startup stays low.
+# usage : python BenchStartup.py --runs 5 --budget 0.5
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+from netaudit import SUBCOMMANDS
+
+# Libraries that are only imported when a subcommand does real work
+HEAVY_MODULES = ["scrapli", "ntc_templates", "textfsm", "networkx", "pyvis", "manuf", "matplotlib", "PIL", "numpy"]
+
+# Maximum median startup time in seconds
+STARTUP_BUDGET = 0.5
+
+# Runs netaudit in the child interpreter and reports the heavy modules on stderr
+PROBE = """
+import sys, runpy
+sys.argv = ["netaudit.py"] + sys.argv[1:]
+try:
+    runpy.run_path("netaudit.py", run_name="__main__")
+except SystemExit:
+    pass
+print(",".join(name for name in {heavy!r} if name in sys.modules), file=sys.stderr)
+"""
+
+def measure(command, runs):
+    """Returns the median wall time of a command and the heavy modules it reported."""
+    times = []
+    loaded = ""
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(command, cwd=directory, capture_output=True, text=True)
+        times.append(time.perf_counter() - start)
+        loaded = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else ""
+    return statistics.median(times), loaded
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Measure the cold start of netaudit.py.")
+    parser.add_argument("--runs", type=int, default=5, help="number of runs per subcommand")
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET, help="maximum median startup time in seconds")
+    args = parser.parse_args()
+
+    baseline, _ = measure([sys.executable, "-c", "pass"], args.runs)
+    print(f"{'command':<28} {'median s':>9}  heavy modules")
+    print(f"{'python -c pass':<28} {baseline:>9.3f}")
+
+    ok = True
+    for arguments in [["--help"]] + [[name, "--help"] for name in SUBCOMMANDS]:
+        elapsed, loaded = measure([sys.executable, "-c", PROBE.format(heavy=HEAVY_MODULES)] + arguments, args.runs)
+        print(f"{'netaudit ' + ' '.join(arguments):<28} {elapsed:>9.3f}  {loaded or '-'}")
+        if elapsed > args.budget or loaded:
+            ok = False
+
+    if not ok:
+        print(f"A subcommand exceeds the {args.budget} second budget or imports a heavy library for --help.")
+        sys.exit(1)
+    print(f"All subcommands start within {args.budget} seconds without heavy libraries.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+
+# created by Alexander Deca - Deca Consulting 06/07/2023
+# please note there is a requirements file -> pip install -r requirements.txt
+# this script benchmarks the reporting code on synthetic outputs of SyntheticCorpus.py:
+# MacLookup.parse_cisco_show_output, SaveVersion.parse_cisco_show_output, and
+# build_network_topology and visualize_network_topology of GetDevicesv6.py.
+# Per case the best time of a few runs and the peak memory (tracemalloc) are measured
+# and compared with the baselines in BenchBaseline.json; a slower or larger case fails.
+# usage : python BenchSuite.py --lines 10 1000 100000 --devices 10 100 1000 [--save]
+
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import tempfile
+import tracemalloc
+import contextlib
+import MacLookup
+import SaveVersion
+import GetDevicesv6
+from SyntheticCorpus import generate_ios_table, generate_show_version, generate_cdp_neighbors, generate_fleet
+
+# Baselines of the cases, written with --save
+baseline_file = "BenchBaseline.json"
+
+# A case fails when it is this much slower or uses this much more memory than its baseline
+TIME_TOLERANCE = 1.5
+MEMORY_TOLERANCE = 1.2
+
+# Differences below this many seconds are timer noise, not a regression
+TIME_NOISE = 0.01
+
+def measure(function, repeat):
+    """Returns the best time of function() over repeat runs, and its peak memory in a separate traced run."""
+    times = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            times.append(time.perf_counter() - start)
+        # tracemalloc slows down the code, so the peak is measured in its own run
+        tracemalloc.start()
+        try:
+            function()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return min(times), peak
+
+def neighbor_source(cdp_outputs):
+    """Returns a neighbor source for build_network_topology that parses generated show cdp neighbors outputs."""
+    from ntc_templates.parse import parse_output
+
+    def get_neighbors(device):
+        return parse_output(platform="cisco_ios", command="show cdp neighbors", data=cdp_outputs[device["hostname"]])
+    return get_neighbors
+
+def build_cases(lines_scales, device_scales):
+    """Returns the (name, function) benchmark cases, the inputs are generated up front."""
+    cases = []
+    for lines in lines_scales:
+        output = generate_ios_table(lines)
+        cases.append((f"MacLookup.parse_cisco_show_output {lines} lines", lambda output=output: MacLookup.parse_cisco_show_output(output)))
+
+    for devices in device_scales:
+        fleet, neighbors = generate_fleet(devices)
+        versions = [generate_show_version(device) for device in fleet]
+        cdp_outputs = {hostname: generate_cdp_neighbors(device_neighbors) for hostname, device_neighbors in neighbors.items()}
+        source = neighbor_source(cdp_outputs)
+        graph = GetDevicesv6.build_network_topology(fleet, source)
+
+        cases.append((f"SaveVersion.parse_cisco_show_output {devices} devices",
+                      lambda versions=versions: [SaveVersion.parse_cisco_show_output(output) for output in versions]))
+        cases.append((f"build_network_topology {devices} devices",
+                      lambda fleet=fleet, source=source: GetDevicesv6.build_network_topology(fleet, source)))
+        cases.append((f"visualize_network_topology {devices} devices",
+                      lambda graph=graph: GetDevicesv6.visualize_network_topology(graph, "hosts_bench.csv")))
+    return cases
+
+def load_baselines(input_file):
+    """Loads the baselines, keyed on case name."""
+    if not os.path.exists(input_file):
+        return {}
+    with open(input_file, "r") as file:
+        return json.load(file)
+
+def save_baselines(baselines, output_file):
+    """Saves the baselines."""
+    temp_file = output_file + ".tmp"
+    with open(temp_file, "w") as file:
+        json.dump(baselines, file, indent=2, sort_keys=True)
+    os.replace(temp_file, output_file)
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Benchmark the parsers and the topology on synthetic outputs.")
+    parser.add_argument("--lines", type=int, nargs="+", default=[10, 1000, 100000], help="MAC address table sizes, up to 500000")
+    parser.add_argument("--devices", type=int, nargs="+", default=[10, 100, 1000], help="fleet sizes, up to 5000")
+    parser.add_argument("--repeat", type=int, default=3, help="number of timed runs per case")
+    parser.add_argument("--baseline", default=baseline_file, help="JSON file with the baselines")
+    parser.add_argument("--save", action="store_true", help="save the results as the new baselines")
+    args = parser.parse_args()
+
+    baseline_path = os.path.abspath(args.baseline)
+    baselines = load_baselines(baseline_path)
+    results = {}
+    regressions = []
+
+    print(f"{'case':<58} {'time ms':>10} {'x base':>7} {'peak MB':>9} {'x base':>7}")
+    # visualize_network_topology writes its HTML file in the current directory
+    with tempfile.TemporaryDirectory() as work_directory:
+        current_directory = os.getcwd()
+        os.chdir(work_directory)
+        try:
+            for name, function in build_cases(args.lines, args.devices):
+                elapsed, peak = measure(function, args.repeat)
+                results[name] = {"time": round(elapsed, 6), "peak_kb": round(peak / 1024, 1)}
+                base = baselines.get(name)
+                time_ratio = elapsed / base["time"] if base and base["time"] else None
+                memory_ratio = peak / 1024 / base["peak_kb"] if base and base["peak_kb"] else None
+                slower = time_ratio and time_ratio > TIME_TOLERANCE and elapsed - base["time"] > TIME_NOISE
+                if slower or (memory_ratio and memory_ratio > MEMORY_TOLERANCE):
+                    regressions.append(name)
+                print(f"{name:<58} {elapsed * 1000:>10.1f} {f'{time_ratio:.2f}' if time_ratio else '-':>7} "
+                      f"{peak / 1024 / 1024:>9.1f} {f'{memory_ratio:.2f}' if memory_ratio else '-':>7}")
+        finally:
+            os.chdir(current_directory)
+
+    if args.save:
+        baselines.update(results)
+        save_baselines(baselines, baseline_path)
+        print(f"Baselines saved in {args.baseline}.")
+    elif regressions:
+        print(f"{len(regressions)} cases are slower or use more memory than their baseline: {', '.join(regressions)}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
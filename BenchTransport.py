@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+
+# created by Alexander Deca - Deca Consulting 06/07/2023
+# please note there is a requirements file -> pip install -r requirements.txt
+# this script compares the scrapli SSH transports (system, paramiko, ssh2, asyncssh)
+# against one device or a local stand-in SSH server that answers like a device.
+# Per transport it measures the connect latency, the command throughput of one
+# session and the memory per open session, including the forked ssh processes.
+# Transports that are not installed are skipped (pip install scrapli[paramiko] etc.).
+# usage : python BenchTransport.py --host 127.0.0.1 --port 2222 --platform iosxe --sessions 10
+
+import os
+import time
+import asyncio
+import argparse
+import statistics
+from scrapli.driver.core import AsyncIOSXEDriver, AsyncNXOSDriver, AsyncIOSXRDriver
+import Connection
+
+ASYNC_DRIVERS = {
+    "iosxe": AsyncIOSXEDriver,
+    "nxos": AsyncNXOSDriver,
+    "iosxr": AsyncIOSXRDriver,
+}
+
+def rss_kb(pid):
+    """Returns the resident memory of a process in kB, 0 when it is gone."""
+    try:
+        with open(f"/proc/{pid}/status", "r") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+def child_pids(pid):
+    """Returns the pids of all descendants of a process."""
+    children = []
+    try:
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children", "r") as f:
+                children.extend(int(child) for child in f.read().split())
+    except OSError:
+        return []
+    return children + [grandchild for child in children for grandchild in child_pids(child)]
+
+def total_rss_kb():
+    """Returns the resident memory of this process and its children (the ssh processes of the system transport)."""
+    pid = os.getpid()
+    return rss_kb(pid) + sum(rss_kb(child) for child in child_pids(pid))
+
+def summary(label, latencies, throughput, memory):
+    """Prints one result line."""
+    latencies = sorted(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"{label:<10} {statistics.mean(latencies) * 1000:>10.1f} {p95 * 1000:>10.1f} "
+          f"{throughput[0]:>10.1f} {throughput[1] / 1024:>10.1f} {memory:>12.0f}")
+
+def bench_sync(device, transport, connects, command, repeat, sessions):
+    """Benchmarks a transport of the sync drivers."""
+    driver = Connection.get_driver(device["platform"])
+    arguments = Connection.connection_arguments(device, transport)
+
+    latencies = []
+    for _ in range(connects):
+        start = time.perf_counter()
+        conn = driver(**arguments)
+        conn.open()
+        latencies.append(time.perf_counter() - start)
+        conn.close()
+
+    conn = driver(**arguments)
+    conn.open()
+    start = time.perf_counter()
+    size = sum(len(conn.send_command(command).result) for _ in range(repeat))
+    elapsed = time.perf_counter() - start
+    conn.close()
+
+    before = total_rss_kb()
+    conns = []
+    try:
+        for _ in range(sessions):
+            conn = driver(**arguments)
+            conn.open()
+            conns.append(conn)
+        memory = (total_rss_kb() - before) / sessions
+    finally:
+        for conn in conns:
+            conn.close()
+    return latencies, (repeat / elapsed, size / elapsed), memory
+
+async def bench_async(device, connects, command, repeat, sessions):
+    """Benchmarks the asyncssh transport of the async drivers."""
+    driver = ASYNC_DRIVERS[device["platform"]]
+    arguments = Connection.connection_arguments(device, "asyncssh")
+
+    latencies = []
+    for _ in range(connects):
+        start = time.perf_counter()
+        conn = driver(**arguments)
+        await conn.open()
+        latencies.append(time.perf_counter() - start)
+        await conn.close()
+
+    conn = driver(**arguments)
+    await conn.open()
+    start = time.perf_counter()
+    size = 0
+    for _ in range(repeat):
+        size += len((await conn.send_command(command)).result)
+    elapsed = time.perf_counter() - start
+    await conn.close()
+
+    before = total_rss_kb()
+    conns = [driver(**arguments) for _ in range(sessions)]
+    try:
+        await asyncio.gather(*(conn.open() for conn in conns))
+        memory = (total_rss_kb() - before) / sessions
+    finally:
+        for conn in conns:
+            if conn.isalive():
+                await conn.close()
+    return latencies, (repeat / elapsed, size / elapsed), memory
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Compare the connect latency, throughput and memory of the SSH transports.")
+    parser.add_argument("--host", default="127.0.0.1", help="IP address of the device or stand-in SSH server")
+    parser.add_argument("--port", type=int, default=Connection.SSH_PORT, help="SSH port")
+    parser.add_argument("--platform", choices=sorted(Connection.DRIVERS), default="iosxe", help="platform of the device")
+    parser.add_argument("--transports", nargs="+", choices=Connection.TRANSPORTS, default=Connection.TRANSPORTS, help="transports to compare")
+    parser.add_argument("--connects", type=int, default=10, help="number of connects to measure the latency")
+    parser.add_argument("--command", default="show running-config", help="command to measure the throughput")
+    parser.add_argument("--repeat", type=int, default=20, help="number of times the command is sent")
+    parser.add_argument("--sessions", type=int, default=10, help="number of sessions open at the same time to measure the memory")
+    args = parser.parse_args()
+
+    if not Connection.check_environment():
+        exit(1)
+    Connection.SSH_PORT = args.port
+    device = {"ip_address": args.host, "platform": args.platform}
+
+    print(f"{'transport':<10} {'connect ms':>10} {'p95 ms':>10} {'cmd/s':>10} {'kB/s':>10} {'kB/session':>12}")
+    for transport in args.transports:
+        try:
+            if transport == "asyncssh":
+                result = asyncio.run(bench_async(device, args.connects, args.command, args.repeat, args.sessions))
+            else:
+                result = bench_sync(device, transport, args.connects, args.command, args.repeat, args.sessions)
+        except Exception as e:
+            # The scrapli errors about missing plugins span several lines
+            reason = next((line for line in str(e).splitlines() if line.strip() and "*" not in line), "")
+            print(f"{transport:<10} skipped: {type(e).__name__} {reason.strip()}")
+            continue
+        summary(transport, *result)
+
+if __name__ == "__main__":
+    main()
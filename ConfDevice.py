@@ -5,98 +5,203 @@
 # this script iterates over a # of commands that will be executed on the network
 # device and saves the configuration.
 # input csv file format is ip_address,name,platform
+# The commands are rolled out in waves: first a canary wave, then batches of
+# devices that are configured concurrently. Every device gets the whole command
+# set in one send_configs call. The rollout is aborted when the number of failed
+# devices exceeds the threshold, and a per-device result report is written.
+# With --delta only the lines missing from the running configuration (pulled
+# fresh, or taken from the latest snapshot) are pushed, compliant devices are skipped.
+# Only complete output_{date} snapshots of the last --max-age days are used, the
+# baseline of every device is written in the report.
+# usage : python ConfDevice.py --canary 1 --batch-size 10 --max-failures 2
+#         python ConfDevice.py --delta snapshot
 
-import time
 import os
 import csv
+import time
 import logging
-import os
-from scrapli.driver.core import IOSXEDriver, NXOSDriver, IOSXRDriver
-from datetime import datetime
+import argparse
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from Connection import check_environment, load_devices, load_commands, establish_connection, close_connection, set_transport, SYNC_TRANSPORTS
+from ConfigDiff import missing_lines
+from Manifest import find_snapshots
+from RunLog import RUN_ID, setup_logging, flush_logging, log_event, read_records, summarize, print_summary
 
 now = datetime.now()
 date = now.strftime("%Y-%m-%d")
 
-# Constants
-SSH_PORT = int(os.getenv("SSH_PORT", 22))
-
-# Environment Variables 
-SSH_USER = os.getenv("SSH_USER")
-SSH_PWD = os.getenv("SSH_PWD")
-
 logging.basicConfig(filename='error.log', level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Check if all required environment variables are set
-if not all([SSH_USER, SSH_PWD, SSH_PORT]):
-    logger.error("One or more environment variables are not set")
-    exit(1)
-
-# Define the CSV file path containing the device details
+# Define the CSV file paths containing the device details and the configuration commands
 csv_file = 'hosts_test.csv'
-
-# Create a list to store the devices
-devices = []
-
-# Read the CSV file and populate the devices list
-with open(csv_file, 'r') as file:
-    reader = csv.DictReader(file)
-    for row in reader:
-        devices.append(row)
-
-# Iterate over the devices
-for device in devices:
-    # Connect to the device using Scrapli
-    driver = None
-    if device["platform"] == "iosxe":
-        driver = IOSXEDriver
-        hostname_line = 0  # Line index for IOS XE
-    elif device["platform"] == "nxos":
-        driver = NXOSDriver
-        hostname_line = 0  # Line index for NX-OS
-    elif device["platform"] == "iosxr":
-        driver = IOSXRDriver
-        hostname_line = 2  # Line index for IOS XR
+conf_commands_file = 'conf-commands.csv'
+
+# Rollout defaults
+CANARY_SIZE = 1
+BATCH_SIZE = 10
+MAX_FAILURES = 0
+
+# Snapshots older than this many days are not used as the --delta snapshot baseline
+MAX_SNAPSHOT_AGE = 1
+
+# Per-device result report
+report_file = f"ConfReport_{date}.csv"
+REPORT_FIELDS = ["hostname", "ip_address", "wave", "status", "baseline", "pushed_lines", "duration", "error"]
+
+def latest_snapshot_config(hostname, max_age=MAX_SNAPSHOT_AGE):
+    """Returns the date and running config of a device from the most recent complete snapshot, or (None, None).
+
+    Snapshots older than max_age days are ignored.
+    """
+    oldest = now.date() - timedelta(days=max_age)
+    for snapshot_date, directory in reversed(find_snapshots(".")):
+        if snapshot_date < oldest:
+            break
+        file_path = os.path.join(directory, f"{hostname}_output", "show_running-config.txt")
+        if os.path.isfile(file_path):
+            with open(file_path, "r") as file:
+                running_config = file.read()
+            if not running_config.startswith("Error executing command"):
+                return snapshot_date, running_config
+    return None, None
+
+def configure_device(device, commands, wave, delta=None, max_age=MAX_SNAPSHOT_AGE):
+    """Sends the commands to one device in a single send_configs call and saves the configuration.
+
+    With delta set to "fresh" or "snapshot" only the commands missing from the running
+    configuration are sent, and a compliant device is left untouched. A compliant device
+    found in a snapshot of the last max_age days is skipped without logging in.
+    """
+    result = {"hostname": device["hostname"], "ip_address": device["ip_address"], "wave": wave, "status": "failed",
+              "baseline": "", "pushed_lines": 0, "duration": 0, "error": ""}
+    start = time.perf_counter()
+
+    if delta == "snapshot":
+        snapshot_date, running_config = latest_snapshot_config(device["hostname"], max_age)
+        if running_config is not None:
+            commands = missing_lines(commands, running_config.splitlines())
+            result["baseline"] = f"snapshot {snapshot_date}"
+            delta = None
+            if not commands:
+                result["status"] = "compliant"
+                return result
+
+    conn = establish_connection(device)
+    if not conn:
+        result["error"] = "connection failed"
+        return result
 
     try:
-        conn = driver(
-            host=device["ip_address"],
-            auth_username=SSH_USER,
-            auth_password=SSH_PWD,
-            auth_strict_key=False,
-            ssh_config_file="~/.ssh/config",
-        )
-        conn.open()
-        if conn.isalive():
-            # Get the hostname from the device["name"]
-            hostname = device["hostname"]
-
-            # # Enter configuration mode
-            # conn.send_command("configure terminal")
-
-            # Read the commands from the CSV file
-            commands = []
-            with open('conf-commands.csv', 'r') as commands_file:
-                commands_reader = csv.reader(commands_file)
-                header = next(commands_reader)
-                for command_row in commands_reader:
-                    commands.append(command_row[0])
-
-            # Execute each command in configuration mode
-            for command in commands:
-                # Send the command
-                conn.send_config(command)
-
-            # Exit configuration mode
-            conn.send_command("end")
-
+        if delta:
+            # No recent snapshot available, use the running configuration of the device
+            response = conn.send_command("show running-config")
+            if response.failed:
+                raise RuntimeError(f"show running-config failed: {response.result}")
+            result["baseline"] = "running-config"
+            commands = missing_lines(commands, response.result.splitlines())
+            if not commands:
+                result["status"] = "compliant"
+                return result
+
+        result["pushed_lines"] = len(commands)
+        response = conn.send_configs(commands)
+        if response.failed:
+            failed_commands = [r.channel_input for r in response if r.failed]
+            result["error"] = f"failed commands: {', '.join(failed_commands)}"
+            logger.error(f"Error occurred while configuring {device['hostname']}: {result['error']}")
+        else:
             # Save configuration
             conn.send_command("write memory")
-
-            logger.info(
-                f"Configuration completed successfully for {device['hostname']}.")
-        else:
-            logger.error(f"Connection to {device['hostname']} is not alive.")
+            result["status"] = "success"
+            logger.info(f"Configuration completed successfully for {device['hostname']}.")
     except Exception as e:
-        logger.error(
-            f"Error occurred while configuring {device['hostname']}: {str(e)}")
\ No newline at end of file
+        result["error"] = str(e)
+        logger.error(f"Error occurred while configuring {device['hostname']}: {str(e)}")
+    finally:
+        close_connection(conn)
+        result["duration"] = round(time.perf_counter() - start, 2)
+    return result
+
+def build_waves(devices, canary_size, batch_size):
+    """Splits the devices in a canary wave followed by batches of batch_size devices."""
+    waves = []
+    if canary_size:
+        waves.append(devices[:canary_size])
+    remaining = devices[canary_size:]
+    for index in range(0, len(remaining), batch_size):
+        waves.append(remaining[index:index + batch_size])
+    return [wave for wave in waves if wave]
+
+def rollout(devices, commands, canary_size=CANARY_SIZE, batch_size=BATCH_SIZE, max_failures=MAX_FAILURES, delta=None,
+            max_age=MAX_SNAPSHOT_AGE):
+    """Configures the devices wave by wave, stops when the canary fails or too many devices failed."""
+    results = []
+    failures = 0
+    waves = build_waves(devices, canary_size, max(batch_size, 1))
+
+    for wave_number, wave in enumerate(waves):
+        with ThreadPoolExecutor(max_workers=len(wave)) as executor:
+            wave_results = list(executor.map(lambda device: configure_device(device, commands, wave_number, delta, max_age), wave))
+        results.extend(wave_results)
+        for result in wave_results:
+            log_event(logger, "device", device=result["hostname"], duration=result["duration"], status=result["status"])
+        wave_failures = sum(1 for result in wave_results if result["status"] not in ("success", "compliant"))
+        failures += wave_failures
+        print(f"Wave {wave_number}: {len(wave) - wave_failures}/{len(wave)} devices configured.")
+
+        canary_failed = canary_size and wave_number == 0 and wave_failures
+        if canary_failed or failures > max_failures:
+            logger.error(f"Rollout aborted after wave {wave_number}, {failures} devices failed.")
+            print(f"Rollout aborted after wave {wave_number}, {failures} devices failed.")
+            for later_wave_number, later_wave in enumerate(waves[wave_number + 1:], start=wave_number + 1):
+                for device in later_wave:
+                    results.append({"hostname": device["hostname"], "ip_address": device["ip_address"], "wave": later_wave_number,
+                                    "status": "aborted", "baseline": "", "pushed_lines": 0, "duration": 0, "error": ""})
+            break
+
+    return results
+
+def write_report(results, output_file):
+    """Writes the per-device result report."""
+    with open(output_file, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+
+def main(argv=None):
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Roll out the configuration commands in waves.")
+    parser.add_argument("--hosts", default=csv_file, help="CSV file with the device details")
+    parser.add_argument("--commands", default=conf_commands_file, help="CSV file with the configuration commands")
+    parser.add_argument("--canary", type=int, default=CANARY_SIZE, help="number of devices in the canary wave")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="number of devices configured concurrently per wave")
+    parser.add_argument("--max-failures", type=int, default=MAX_FAILURES, help="abort when more devices failed")
+    parser.add_argument("--delta", choices=["fresh", "snapshot"], help="only push the lines missing from the running config")
+    parser.add_argument("--max-age", type=int, default=MAX_SNAPSHOT_AGE, help="maximum age in days of the --delta snapshot baseline")
+    parser.add_argument("--transport", choices=SYNC_TRANSPORTS, help="SSH transport of this run, overrides SSH_TRANSPORT")
+    args = parser.parse_args(argv)
+    setup_logging()
+
+    if args.transport:
+        set_transport(args.transport)
+
+    # Check if all required environment variables are set
+    if not check_environment():
+        exit(1)
+
+    devices = load_devices(args.hosts)
+    commands = load_commands(args.commands)
+
+    results = rollout(devices, commands, args.canary, args.batch_size, args.max_failures, args.delta, args.max_age)
+    write_report(results, report_file)
+    pushed = [result for result in results if result["status"] == "success"]
+    skipped = [result for result in results if result["status"] == "compliant"]
+    print(f"{len(pushed)} devices pushed ({sum(result['pushed_lines'] for result in pushed)} lines), {len(skipped)} compliant devices skipped.")
+    print(f"Report saved in {report_file}.")
+    if flush_logging():
+        print_summary(summarize(read_records(run=RUN_ID)))
+
+if __name__ == "__main__":
+    main()
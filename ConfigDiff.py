@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+
+# created by Alexander Deca - Deca Consulting 06/07/2023
+# please note there is a requirements file -> pip install -r requirements.txt
+# this module contains the config aware diff used by RunDiff.py.
+# Volatile lines (configuration size, NTP clock period, uptime, log timestamps)
+# are normalised per command before the diff. Running configurations are diffed
+# per parent stanza, e.g. a changed description is shown under its interface.
+# Lines are compared with a patience diff, which only anchors on lines that are
+# unique in both files and runs in O(n log n) instead of difflib's quadratic worst case.
+
+import re
+import difflib
+from bisect import bisect_left
+from Locate import normalize_interface
+
+# Volatile line patterns per command, the key is the start of the saved output file name.
+# A pattern with replacement None removes the line, otherwise the match is replaced.
+VOLATILE_PATTERNS = {
+    "show_running-config": [
+        (re.compile(r"^Building configuration"), None),
+        (re.compile(r"^Current configuration\s*:"), None),
+        (re.compile(r"^! (?:Last configuration change|NVRAM config last updated) at"), None),
+        (re.compile(r"^!Time:"), None),
+        (re.compile(r"^ntp clock-period"), None),
+    ],
+    "show_version": [
+        (re.compile(r"uptime is .*$"), "uptime is <uptime>"),
+        (re.compile(r"^Uptime for this control processor is"), None),
+        (re.compile(r"^System returned to ROM by .*$"), None),
+        (re.compile(r"^System restarted at"), None),
+        (re.compile(r"^Kernel uptime is"), None),
+    ],
+    "show_logging": [
+        (re.compile(r"^\d+: "), ""),
+        (re.compile(r"^\*?[A-Z][a-z]{2}\s+\d+\s+(?:\d{4}\s+)?\d+:\d+:\d+(?:\.\d+)?(?:\s+[A-Z]{2,5})?:\s*"), ""),
+        (re.compile(r"\d+ messages logged"), "<n> messages logged"),
+        (re.compile(r"\d+ message lines logged"), "<n> message lines logged"),
+        (re.compile(r"\d+ messages rate-limited"), "<n> messages rate-limited"),
+        (re.compile(r"\d+ flushes, \d+ overruns"), "<n> flushes, <n> overruns"),
+        (re.compile(r"Log Buffer \(\d+ bytes\)"), "Log Buffer (<n> bytes)"),
+    ],
+}
+
+# Regions without unique lines that are smaller than this are diffed with difflib
+SMALL_REGION = 200
+
+# Commands that enter a configuration mode, used to nest flat command lists
+MODE_COMMANDS = [
+    "interface", "router", "line", "vlan", "ip access-list", "ipv6 access-list", "route-map", "policy-map",
+    "class-map", "vrf definition", "ip vrf", "key chain", "spanning-tree mst configuration", "aaa group server",
+]
+# Commands that enter a sub mode of a mode
+SUBMODE_COMMANDS = {
+    "router": ["address-family"],
+    "vrf definition": ["address-family"],
+    "policy-map": ["class"],
+}
+
+
+def normalize_lines(lines, command):
+    """Removes or rewrites the volatile lines of a command output."""
+    patterns = []
+    for prefix, command_patterns in VOLATILE_PATTERNS.items():
+        if command.startswith(prefix):
+            patterns = command_patterns
+            break
+    if not patterns:
+        return list(lines)
+
+    normalized = []
+    for line in lines:
+        for pattern, replacement in patterns:
+            if pattern.search(line):
+                if replacement is None:
+                    line = None
+                    break
+                line = pattern.sub(replacement, line)
+        if line is not None:
+            normalized.append(line)
+    return normalized
+
+
+def longest_increasing_subsequence(pairs):
+    """Returns the longest subsequence of (i, j) pairs, sorted on i, where j is increasing."""
+    tails = []
+    tail_indexes = []
+    previous = [-1] * len(pairs)
+    for index, (i, j) in enumerate(pairs):
+        position = bisect_left(tails, j)
+        if position == len(tails):
+            tails.append(j)
+            tail_indexes.append(index)
+        else:
+            tails[position] = j
+            tail_indexes[position] = index
+        previous[index] = tail_indexes[position - 1] if position else -1
+
+    result = []
+    index = tail_indexes[-1] if tail_indexes else -1
+    while index != -1:
+        result.append(pairs[index])
+        index = previous[index]
+    return result[::-1]
+
+
+def unique_anchors(a, b, a_start, a_end, b_start, b_end):
+    """Returns the (i, j) pairs of lines that occur exactly once in both regions, in patience order."""
+    a_counts, a_positions = {}, {}
+    for i in range(a_start, a_end):
+        a_counts[a[i]] = a_counts.get(a[i], 0) + 1
+        a_positions[a[i]] = i
+    b_counts, b_positions = {}, {}
+    for j in range(b_start, b_end):
+        b_counts[b[j]] = b_counts.get(b[j], 0) + 1
+        b_positions[b[j]] = j
+    pairs = sorted(
+        (a_positions[line], b_positions[line])
+        for line, count in a_counts.items()
+        if count == 1 and b_counts.get(line) == 1
+    )
+    return longest_increasing_subsequence(pairs)
+
+
+def matching_blocks(a, b):
+    """Returns the matching (i, j, size) blocks between two lists of lines using a patience diff."""
+    matches = []
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        a_start, a_end, b_start, b_end = stack.pop()
+
+        # Common prefix and suffix
+        while a_start < a_end and b_start < b_end and a[a_start] == b[b_start]:
+            matches.append((a_start, b_start))
+            a_start += 1
+            b_start += 1
+        while a_start < a_end and b_start < b_end and a[a_end - 1] == b[b_end - 1]:
+            a_end -= 1
+            b_end -= 1
+            matches.append((a_end, b_end))
+        if a_start == a_end or b_start == b_end:
+            continue
+
+        anchors = unique_anchors(a, b, a_start, a_end, b_start, b_end)
+        if anchors:
+            # Diff the regions between the anchors
+            previous_i, previous_j = a_start, b_start
+            for i, j in anchors:
+                matches.append((i, j))
+                stack.append((previous_i, i, previous_j, j))
+                previous_i, previous_j = i + 1, j + 1
+            stack.append((previous_i, a_end, previous_j, b_end))
+        elif a_end - a_start <= SMALL_REGION and b_end - b_start <= SMALL_REGION:
+            matcher = difflib.SequenceMatcher(None, a[a_start:a_end], b[b_start:b_end], autojunk=False)
+            for i, j, size in matcher.get_matching_blocks():
+                matches.extend((a_start + i + k, b_start + j + k) for k in range(size))
+        # Larger regions without any unique line are reported as replaced
+
+    blocks = []
+    for i, j in sorted(matches):
+        if blocks and blocks[-1][0] + blocks[-1][2] == i and blocks[-1][1] + blocks[-1][2] == j:
+            blocks[-1][2] += 1
+        else:
+            blocks.append([i, j, 1])
+    return [tuple(block) for block in blocks]
+
+
+def opcodes(a, b):
+    """Returns difflib style (tag, i1, i2, j1, j2) opcodes for two lists of lines."""
+    result = []
+    i = j = 0
+    for block_i, block_j, size in matching_blocks(a, b) + [(len(a), len(b), 0)]:
+        if i < block_i and j < block_j:
+            result.append(("replace", i, block_i, j, block_j))
+        elif i < block_i:
+            result.append(("delete", i, block_i, j, j))
+        elif j < block_j:
+            result.append(("insert", i, i, j, block_j))
+        if size:
+            result.append(("equal", block_i, block_i + size, block_j, block_j + size))
+        i, j = block_i + size, block_j + size
+    return result
+
+
+def grouped_opcodes(codes, context=3):
+    """Groups opcodes into hunks with the given number of context lines, like difflib does."""
+    if not codes:
+        return
+    codes = list(codes)
+    if codes[0][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[0]
+        codes[0] = tag, max(i1, i2 - context), i2, max(j1, j2 - context), j2
+    if codes[-1][0] == "equal":
+        tag, i1, i2, j1, j2 = codes[-1]
+        codes[-1] = tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)
+
+    group = []
+    for tag, i1, i2, j1, j2 in codes:
+        # Split a large unchanged range into the end of one hunk and the start of the next
+        if tag == "equal" and i2 - i1 > context * 2:
+            group.append((tag, i1, min(i2, i1 + context), j1, min(j2, j1 + context)))
+            yield group
+            group = []
+            i1, j1 = max(i1, i2 - context), max(j1, j2 - context)
+        group.append((tag, i1, i2, j1, j2))
+    if group and not (len(group) == 1 and group[0][0] == "equal"):
+        yield group
+
+
+def format_range(start, stop):
+    """Formats a hunk range the way unified diffs do."""
+    length = stop - start
+    if length == 1:
+        return f"{start + 1}"
+    if length == 0:
+        return f"{start},0"
+    return f"{start + 1},{length}"
+
+
+def unified_diff(a, b, fromfile="", tofile="", context=3):
+    """Yields a unified diff of two lists of lines, in the same format as difflib.unified_diff."""
+    started = False
+    for group in grouped_opcodes(opcodes(a, b), context):
+        if not started:
+            started = True
+            yield f"--- {fromfile}\n"
+            yield f"+++ {tofile}\n"
+        first, last = group[0], group[-1]
+        yield f"@@ -{format_range(first[1], last[2])} +{format_range(first[3], last[4])} @@\n"
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                for line in a[i1:i2]:
+                    yield " " + line
+                continue
+            for line in a[i1:i2]:
+                yield "-" + line
+            for line in b[j1:j2]:
+                yield "+" + line
+
+
+def parse_stanzas(lines):
+    """Parses a running configuration into a tree of (line, children) tuples based on indentation."""
+    root = []
+    stack = [(-1, root)]
+    for line in lines:
+        stripped = line.rstrip()
+        if not stripped or stripped.strip() == "!":
+            continue
+        indent = len(stripped) - len(stripped.lstrip())
+        while stack[-1][0] >= indent:
+            stack.pop()
+        children = []
+        stack[-1][1].append((stripped, children))
+        stack.append((indent, children))
+    return root
+
+
+def stanza_keys(nodes):
+    """Returns a unique key per stanza, repeated lines get an occurrence number."""
+    seen = {}
+    keys = []
+    for line, children in nodes:
+        seen[line] = seen.get(line, 0) + 1
+        keys.append((line, seen[line]))
+    return keys
+
+
+def flatten(node, prefix):
+    """Returns a stanza and all of its children as diff lines with the given prefix."""
+    line, children = node
+    lines = [f"{prefix}{line}\n"]
+    for child in children:
+        lines.extend(flatten(child, prefix))
+    return lines
+
+
+def diff_stanzas(a_nodes, b_nodes, parents=()):
+    """Yields the hierarchical diff of two stanza trees, changed children are shown under their parents."""
+    a_keys, b_keys = stanza_keys(a_nodes), stanza_keys(b_nodes)
+    for tag, i1, i2, j1, j2 in opcodes(a_keys, b_keys):
+        if tag == "equal":
+            for a_node, b_node in zip(a_nodes[i1:i2], b_nodes[j1:j2]):
+                if a_node[1] != b_node[1]:
+                    yield from diff_stanzas(a_node[1], b_node[1], parents + (a_node[0],))
+            continue
+        changed = [line for node in a_nodes[i1:i2] for line in flatten(node, "-")]
+        changed += [line for node in b_nodes[j1:j2] for line in flatten(node, "+")]
+        if parents:
+            yield "@@ " + " / ".join(parent.strip() for parent in parents) + "\n"
+        yield from changed
+
+
+def config_diff(a, b, command, fromfile="", tofile=""):
+    """Yields the diff of two command outputs after normalising the volatile lines.
+
+    Running configurations are diffed per stanza, other outputs with a unified patience diff.
+    """
+    a = normalize_lines(a, command)
+    b = normalize_lines(b, command)
+    if command.startswith("show_running-config") or command.startswith("show_run"):
+        lines = list(diff_stanzas(parse_stanzas(a), parse_stanzas(b)))
+        if lines:
+            yield f"--- {fromfile}\n"
+            yield f"+++ {tofile}\n"
+            yield from lines
+    else:
+        yield from unified_diff(a, b, fromfile=fromfile, tofile=tofile)
+
+
+def command_key(line):
+    """Returns the key a configuration line is compared on: the line with normalised spacing.
+
+    An interface line gets the keyword in full and the short interface name, e.g.
+    "int Gi1/0/1" and "interface GigabitEthernet1/0/1" both become "interface gi1/0/1".
+    Other abbreviated commands are not expanded.
+    """
+    key = " ".join(line.split())
+    keyword, _, name = key.partition(" ")
+    if name and len(keyword) >= 3 and "interface".startswith(keyword.lower()):
+        return "interface " + normalize_interface(name)
+    return key
+
+
+def stanza_index(nodes):
+    """Returns a dictionary of the stanzas on one level, keyed on command_key."""
+    index = {}
+    for line, children in nodes:
+        index.setdefault(command_key(line), []).extend(children)
+    return index
+
+
+def command_prefix(key, prefixes):
+    """Returns the prefix the command starts with as whole words, or None."""
+    for prefix in prefixes:
+        if key == prefix or key.startswith(prefix + " "):
+            return prefix
+    return None
+
+
+def nest_flat_commands(lines):
+    """Indents a flat command list the way the device nests it in the running configuration.
+
+    Lines after a mode command (interface, router, line, vlan, ...) are its children until
+    "exit", "end" or the next mode command; a sub mode (address-family, class) ends with
+    "exit" or "exit-address-family". Lists that are already indented are returned unchanged.
+    """
+    if any(line.strip() and line[:1].isspace() for line in lines):
+        return list(lines)
+
+    nested = []
+    mode = submode = None
+    for line in lines:
+        key = " ".join(line.split())
+        if not key or key == "!":
+            continue
+        if key == "end":
+            mode = submode = None
+        elif key in ("exit", "exit-address-family"):
+            if submode:
+                submode = None
+            elif key == "exit":
+                mode = None
+        elif command_prefix(command_key(key), MODE_COMMANDS):
+            mode, submode = command_prefix(command_key(key), MODE_COMMANDS), None
+            nested.append(key)
+        elif mode and command_prefix(key, SUBMODE_COMMANDS.get(mode, [])):
+            submode = key
+            nested.append(" " + key)
+        else:
+            nested.append(("  " if submode else " " if mode else "") + key)
+    return nested
+
+
+def missing_lines(intended, running):
+    """Returns the intended configuration lines that are not in the running configuration.
+
+    Both configurations are compared per stanza, a missing child line is returned
+    together with its parent lines so it can be sent in the right configuration mode.
+    A "no" command is missing when the command it removes is still configured.
+    Flat command lists are nested first, see nest_flat_commands. Lines are matched on
+    command_key: abbreviated interface lines match, other abbreviated commands such as
+    "sw mode access" do not and have to be written in full like the running configuration.
+    """
+    def missing(intended_nodes, running_nodes):
+        running_index = stanza_index(running_nodes)
+        lines = []
+        for line, children in intended_nodes:
+            key = command_key(line)
+            if key.startswith("no ") and key not in running_index:
+                if command_key(key[3:]) in running_index:
+                    lines.append(line + "\n")
+                continue
+            if key not in running_index:
+                lines.extend(flatten((line, children), ""))
+                continue
+            child_lines = missing(children, running_index[key])
+            if child_lines:
+                lines.append(line + "\n")
+                lines.extend(child_lines)
+        return lines
+
+    intended = nest_flat_commands(intended)
+    return [line.rstrip("\n") for line in missing(parse_stanzas(intended), parse_stanzas(running))]
@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+
+# created by Alexander Deca - Deca Consulting 06/07/2023
+# please note there is a requirements file -> pip install -r requirements.txt
+# this module contains the connection handling shared by the scripts that log in
+# to the network devices.
+# The logins of all threads pass through one token bucket (LOGIN_RATE logins per
+# second, bursts of LOGIN_BURST), so parallel runs do not overload the TACACS+/RADIUS
+# servers. Logins that time out are retried with a jittered exponential backoff.
+# The scrapli transport is chosen with SSH_TRANSPORT, per platform with
+# SSH_TRANSPORT_<PLATFORM> (e.g. SSH_TRANSPORT_NXOS=paramiko), or per run with --transport.
+# input csv file format is ip_address,hostname,platform,type
+
+import os
+import csv
+import time
+import random
+import hashlib
+import logging
+import threading
+from RunLog import log_event
+
+# Constants
+SSH_PORT = int(os.getenv("SSH_PORT", 22))
+# Driver per platform, scrapli is only imported when the first connection is opened
+DRIVERS = {
+    "iosxe": "IOSXEDriver",
+    "nxos": "NXOSDriver",
+    "iosxr": "IOSXRDriver",
+}
+
+# The system transport forks an OpenSSH process per session, paramiko and ssh2 run
+# inside the process (pip install scrapli[paramiko] or scrapli[ssh2]).
+# asyncssh needs the async drivers, it is only used by BenchTransport.py.
+TRANSPORTS = ["system", "paramiko", "ssh2", "asyncssh"]
+SYNC_TRANSPORTS = ["system", "paramiko", "ssh2"]
+DEFAULT_TRANSPORT = "system"
+SSH_TRANSPORT = os.getenv("SSH_TRANSPORT", DEFAULT_TRANSPORT)
+
+# Transport chosen for this run on the command line, overrides the environment variables
+run_transport = None
+
+# Login rate limit over all threads, independent of the number of workers, a rate of 0 is unlimited
+LOGIN_RATE = float(os.getenv("LOGIN_RATE", 5))
+LOGIN_BURST = int(os.getenv("LOGIN_BURST", 5))
+
+# Retries of a login that timed out, the backoff doubles from BACKOFF_BASE up to BACKOFF_MAX seconds
+LOGIN_RETRIES = 2
+BACKOFF_BASE = 2
+BACKOFF_MAX = 30
+
+# Environment Variables
+SSH_USER = os.getenv("SSH_USER")
+SSH_PWD = os.getenv("SSH_PWD")
+
+logger = logging.getLogger(__name__)
+
+def check_environment():
+    """Checks if all required environment variables are set."""
+    if not all([SSH_USER, SSH_PWD, SSH_PORT]):
+        logger.error("One or more environment variables are not set")
+        return False
+    return True
+
+def parse_shard(shard):
+    """Parses a shard given as i/N into a (i, N) tuple, i counts from 1."""
+    index, count = (int(value) for value in shard.split("/"))
+    if not 1 <= index <= count:
+        raise ValueError(f"Invalid shard {shard}, expected i/N with 1 <= i <= N")
+    return index, count
+
+def in_shard(ip_address, shard):
+    """Returns True when a device belongs to the (i, N) shard, based on a hash of its IP address."""
+    index, count = shard
+    digest = hashlib.sha1(ip_address.strip().encode()).digest()
+    return int.from_bytes(digest[:8], "big") % count == index - 1
+
+class TokenBucket:
+    """Thread safe token bucket, acquire blocks until a token is available. A rate of 0 does not limit."""
+
+    def __init__(self, rate, burst):
+        if rate < 0:
+            raise ValueError(f"Login rate must be 0 (unlimited) or a positive number of logins per second, not {rate}")
+        if rate > 0 and burst < 1:
+            raise ValueError(f"Login burst must be at least 1, not {burst}")
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+        # Metrics of the run
+        self.acquired = 0
+        self.retries = 0
+        self.wait_time = 0.0
+        self.max_wait = 0.0
+
+    def acquire(self):
+        """Takes a token, waiting when the bucket is empty, and returns the time waited."""
+        start = time.monotonic()
+        if not self.rate:
+            with self.lock:
+                self.acquired += 1
+            return 0.0
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    waited = now - start
+                    self.acquired += 1
+                    self.wait_time += waited
+                    self.max_wait = max(self.max_wait, waited)
+                    return waited
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+    def record_retry(self):
+        """Counts a retried login."""
+        with self.lock:
+            self.retries += 1
+
+    def stats(self):
+        """Returns the metrics of the logins so far."""
+        with self.lock:
+            return {
+                "logins": self.acquired,
+                "login_retries": self.retries,
+                "login_wait": round(self.wait_time, 2),
+                "login_max_wait": round(self.max_wait, 2),
+            }
+
+# Shared by all threads of the process
+login_limiter = TokenBucket(LOGIN_RATE, LOGIN_BURST)
+
+def is_login_timeout(exception):
+    """Returns True for a login that timed out, a rejected password is not retried to avoid lockouts."""
+    from scrapli.exceptions import ScrapliAuthenticationFailed, ScrapliConnectionNotOpened, ScrapliTimeout
+    if isinstance(exception, (ScrapliTimeout, ScrapliConnectionNotOpened, TimeoutError)):
+        return True
+    return isinstance(exception, ScrapliAuthenticationFailed) and "timed out" in str(exception).lower()
+
+def backoff_delay(attempt):
+    """Returns the jittered backoff before retry attempt (1, 2, ...)."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempt - 1)))
+
+def load_devices(csv_file, shard=None):
+    """Reads the CSV file with the device details, only keeping the devices of the (i, N) shard when given."""
+    with open(csv_file, 'r') as file:
+        devices = list(csv.DictReader(file))
+    if shard:
+        devices = [device for device in devices if in_shard(device["ip_address"], shard)]
+    return devices
+
+def load_commands(csv_file):
+    """Reads the commands from the first column of a CSV file with a header."""
+    commands = []
+    with open(csv_file, 'r') as commands_file:
+        commands_reader = csv.reader(commands_file)
+        next(commands_reader)
+        for command_row in commands_reader:
+            if command_row:
+                commands.append(command_row[0])
+    return commands
+
+def set_transport(transport):
+    """Sets the transport of all connections of this run."""
+    global run_transport
+    if transport not in SYNC_TRANSPORTS:
+        raise ValueError(f"Unsupported transport: {transport}, expected one of {', '.join(SYNC_TRANSPORTS)}")
+    run_transport = transport
+
+def transport_for(platform):
+    """Returns the transport of a platform, the run transport first, then SSH_TRANSPORT_<PLATFORM>, then SSH_TRANSPORT."""
+    transport = run_transport or os.getenv(f"SSH_TRANSPORT_{platform.upper()}", SSH_TRANSPORT)
+    if transport not in SYNC_TRANSPORTS:
+        logger.error(f"Transport {transport} is not supported by the sync drivers, using {DEFAULT_TRANSPORT}")
+        return DEFAULT_TRANSPORT
+    return transport
+
+def connection_arguments(device, transport):
+    """Returns the scrapli driver arguments of a device."""
+    return {
+        "host": device["ip_address"],
+        "port": SSH_PORT,
+        "auth_username": SSH_USER,
+        "auth_password": SSH_PWD,
+        "auth_strict_key": False,
+        "ssh_config_file": "~/.ssh/config",
+        "transport": transport,
+    }
+
+def device_name(device):
+    """Returns the hostname of a device, or its IP address when the hostname is not known yet."""
+    return device.get("hostname") or device.get("name") or device["ip_address"]
+
+def get_driver(platform):
+    """Returns the scrapli driver class of a platform, None for an unsupported platform."""
+    if platform not in DRIVERS:
+        return None
+    from scrapli.driver import core
+    return getattr(core, DRIVERS[platform])
+
+def establish_connection(device):
+    """Establishes a connection to a network device."""
+    driver = get_driver(device["platform"])
+    if driver is None:
+        logger.error(f"Unsupported platform: {device['platform']}")
+        return None
+
+    for attempt in range(LOGIN_RETRIES + 1):
+        if attempt:
+            login_limiter.record_retry()
+            time.sleep(backoff_delay(attempt))
+        waited = login_limiter.acquire()
+        log_event(logger, "login_wait", device=device_name(device), duration=round(waited, 3))
+        start = time.perf_counter()
+        conn = None
+        try:
+            conn = driver(**connection_arguments(device, transport_for(device["platform"])))
+            conn.open()
+            if conn.isalive():
+                log_event(logger, "connect", device=device_name(device), duration=round(time.perf_counter() - start, 3), status="ok")
+                return conn
+            logger.error(f"Connection to {device_name(device)} is not alive.")
+            discard_connection(conn)
+            return None
+        except Exception as e:
+            # A half open transport is closed before the retry, so it does not leak
+            discard_connection(conn)
+            log_event(logger, "connect", device=device_name(device), duration=round(time.perf_counter() - start, 3), status="error")
+            if is_login_timeout(e) and attempt < LOGIN_RETRIES:
+                logger.error(f"Login to {device['ip_address']} timed out, retrying: {str(e)}")
+                continue
+            logger.error(f"Error occurred while establishing connection with {device['ip_address']}: {str(e)}")
+            return None
+
+def discard_connection(conn):
+    """Closes a connection that failed to open, errors while closing it are ignored."""
+    if conn is None:
+        return
+    try:
+        conn.close()
+    except Exception as e:
+        logger.debug(f"Error while closing a failed connection: {str(e)}")
+
+def close_connection(conn):
+    """Closes a connection to a network device."""
+    if conn:
+        conn.close()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+
+# created by Alexander Deca - Deca Consulting 06/07/2023
+# please note there is a requirements file -> pip install -r requirements.txt
+# this script builds an endpoint inventory (IP, MAC, vendor, switch, port, VLAN).
+# It parses the saved show ip arp, show ip dhcp snooping binding and
+# show device-tracking database outputs of the whole fleet and joins them on
+# MAC address with the access ports found by Locate.py.
+# csv output file format : ip_address,mac_address,vendor,switch,interface,vlan,source
+
+import os
+import re
+import csv
+import logging
+import Locate
+from MacLookup import get_mac_parser
+
+logging.basicConfig(filename='error.log', level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Specify the directory path containing the subdirectories with show command output
+directory_path = "output"
+
+# Specify the output CSV file path
+output_csv_file = "EndpointInventory.csv"
+
+IP = r"\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}"
+CISCO_MAC = r"[0-9a-fA-F]{4}\.[0-9a-fA-F]{4}\.[0-9a-fA-F]{4}"
+COLON_MAC = r"[0-9a-fA-F]{2}(?::[0-9a-fA-F]{2}){5}"
+
+# Each saved output file maps to a regular expression with the named groups ip, mac and
+# optionally interface and vlan. All entries of a file are found in one pass.
+SOURCES = {
+    "show_ip_arp.txt": re.compile(
+        # IOS: Internet  10.1.1.1  5  aabb.ccdd.eeff  ARPA  Vlan10
+        # NX-OS: 10.1.1.1  00:05:12  aabb.ccdd.eeff  Vlan10
+        rf"^[^\S\n]*(?:Internet[^\S\n]+)?(?P<ip>{IP})[^\S\n]+\S+[^\S\n]+(?P<mac>{CISCO_MAC})", re.M),
+    "show_ip_dhcp_snooping_binding.txt": re.compile(
+        # 00:11:22:33:44:55  10.1.1.5  86313  dhcp-snooping  10  GigabitEthernet1/0/5
+        rf"^[^\S\n]*(?P<mac>{COLON_MAC})[^\S\n]+(?P<ip>{IP})[^\S\n]+\S+[^\S\n]+\S+[^\S\n]+(?P<vlan>\d+)[^\S\n]+(?P<interface>\S+)", re.M),
+    "show_device-tracking_database.txt": re.compile(
+        # ARP  10.1.1.5  aabb.ccdd.eeff  Gi1/0/5  10  0005  2s  REACHABLE
+        rf"^[^\S\n]*\S+[^\S\n]+(?P<ip>{IP})[^\S\n]+(?P<mac>{CISCO_MAC})[^\S\n]+(?P<interface>\S+)[^\S\n]+(?P<vlan>\d+)", re.M),
+}
+
+
+def parse_bindings(output, pattern):
+    """Returns (ip_address, mac_address, interface, vlan) tuples found in an output."""
+    bindings = []
+    for match in pattern.finditer(output):
+        groups = match.groupdict()
+        mac_address = Locate.normalize_mac(groups["mac"])
+        if mac_address:
+            bindings.append((groups["ip"], mac_address, groups.get("interface") or "", groups.get("vlan") or ""))
+    return bindings
+
+
+def collect_bindings(directory):
+    """Collects the IP to MAC bindings of every saved output, keyed on (ip_address, mac_address)."""
+    bindings = {}
+    for root, dirs, files in os.walk(directory):
+        for file in files:
+            pattern = SOURCES.get(file)
+            if pattern is None:
+                continue
+            file_path = os.path.join(root, file)
+            host = Locate.host_from_directory(root)
+            try:
+                with open(file_path, "r") as f:
+                    entries = parse_bindings(f.read(), pattern)
+            except Exception as e:
+                logger.error(f"Failed to parse bindings in {file_path}: {e}")
+                continue
+            source = file[:-len(".txt")]
+            for ip_address, mac_address, interface, vlan in entries:
+                binding = bindings.setdefault((ip_address, mac_address), {"sources": set(), "host": "", "interface": "", "vlan": ""})
+                binding["sources"].add(f"{host}:{source}")
+                # Snooping and device tracking know the access port, keep it for MAC addresses Locate cannot place
+                if interface and not binding["interface"]:
+                    binding.update(host=host, interface=interface, vlan=vlan)
+    return bindings
+
+
+def build_inventory(bindings, index):
+    """Joins the bindings with the Locate index on MAC address, returns the inventory rows."""
+    mlookup = get_mac_parser()
+    rows = []
+    for (ip_address, mac_address), binding in bindings.items():
+        location = index.get(mac_address)
+        if location:
+            switch, interface, vlan, vendor = location["host"], location["interface"], location["vlan"], location["vendor"]
+        else:
+            switch, interface, vlan = binding["host"], binding["interface"], binding["vlan"]
+            vendor = mlookup.get_manuf(mac_address) or "N/A"
+        rows.append([ip_address, mac_address, vendor, switch, interface, vlan, " ".join(sorted(binding["sources"]))])
+    return rows
+
+
+def main():
+    """Main execution function."""
+    try:
+        index = Locate.get_index(Locate.mac_csv_file, directory_path, Locate.index_file)
+    except Exception as e:
+        logger.error(f"Failed to build the locate index: {e}")
+        return
+
+    rows = build_inventory(collect_bindings(directory_path), index)
+
+    try:
+        with open(output_csv_file, "w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(["ip_address", "mac_address", "vendor", "switch", "interface", "vlan", "source"])
+            writer.writerows(sorted(rows))
+    except Exception as e:
+        logger.error(f"Failed to write {output_csv_file}: {e}")
+
+if __name__ == "__main__":
+    main()
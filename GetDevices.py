@@ -3,15 +3,11 @@
 # created by Alexander Deca - Deca Consulting 06/07/2023
 # please note there is a requirements file -> pip install -r requirements.txt
 # input csv file format is ip_address,hostname,platform
+# scrapli, networkx, matplotlib, PIL and ntc_templates are only imported when they are needed.
 
 import csv
 import logging
-from scrapli.driver.core import IOSXEDriver, NXOSDriver, IOSXRDriver
-import networkx as nx
-import matplotlib.pyplot as plt
 import os
-import PIL
-from ntc_templates.parse import parse_output
 
 # Constants
 SSH_PORT = int(os.getenv("SSH_PORT", 22))
@@ -26,11 +22,6 @@ SSH_PWD = os.getenv("SSH_PWD")
 logging.basicConfig(filename='error.log', level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Check if all required environment variables are set
-if not all([SSH_USER, SSH_PWD, SSH_PORT]):
-    logger.error("One or more environment variables are not set")
-    exit(1)
-
 # Create dictionary from the different platform types for using the correct image for graph nodes
 
 platform = {value: 'aswitch' for value in ASWITCH}
@@ -46,11 +37,13 @@ icons = {
     "PC": "icons/pc.png",
 }
 
-# Load images defined for graph nodes
-
-images = {k: PIL.Image.open(fname) for k, fname in icons.items()}
+def load_images():
+    """Loads the images defined for graph nodes."""
+    from PIL import Image
+    return {k: Image.open(fname) for k, fname in icons.items()}
 
 def establish_connection(device):
+    from scrapli.driver.core import IOSXEDriver, NXOSDriver, IOSXRDriver
     driver = None
     if device["platform"] == "iosxe":
         driver = IOSXEDriver
@@ -99,6 +92,7 @@ def get_neighbors(device):
 
     neighbors = []
     try:
+        from ntc_templates.parse import parse_output
         show_command = "show cdp neighbors"
         response_neighbors = conn.send_command(show_command).result
         parsed_output = parse_output(platform=ntc, command="show cdp neighbors", data=response_neighbors)
@@ -115,6 +109,8 @@ def get_neighbors(device):
     return neighbors
 
 def build_network_topology(devices):
+    import networkx as nx
+    images = load_images()
     G = nx.Graph()
     added_devices = set()  # Set to store unique device names
 
@@ -161,6 +157,8 @@ def build_network_topology(devices):
 
 
 def visualize_network_topology(network_topology):
+    import networkx as nx
+    import matplotlib.pyplot as plt
     pos = nx.circular_layout(network_topology)
     plt.figure(figsize=(20, 12))
     nx.draw(network_topology, pos, with_labels=True, node_size=500, node_color="lightblue", font_size=8)
@@ -176,6 +174,11 @@ def visualize_network_topology(network_topology):
     plt.show()
 
 def main():
+    # Check if all required environment variables are set
+    if not all([SSH_USER, SSH_PWD, SSH_PORT]):
+        logger.error("One or more environment variables are not set")
+        exit(1)
+
     devices = []
     with open("hosts_brugge.csv", "r") as file:
         csv_reader = csv.DictReader(file)
@@ -3,36 +3,31 @@
 # created by Alexander Deca - Deca Consulting 06/07/2023
 # please note there is a requirements file -> pip install -r requirements.txt
 # input csv file format is ip_address,hostname,platform,type
+# ntc_templates, networkx and pyvis are only imported when they are needed.
+# The topology graph is saved as {location}_topology.pickle for TopologyQuery.py.
+# usage : python GetDevicesv6.py --hosts hosts_brugge.csv
 
+import os
 import csv
+import pickle
 import logging
-import os
-from ntc_templates.parse import parse_output
-from pyvis.network import Network
-from scrapli.driver.core import IOSXEDriver, NXOSDriver, IOSXRDriver
-import networkx as nx
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from Connection import check_environment, establish_connection, close_connection
 
 # Constants
-SSH_PORT = int(os.getenv("SSH_PORT", 22))
 ROUTER = ['ISR4331B', 'C897VAK9']
 ASWITCH = ['WSC3650', 'C9300L24', 'C9300L48']
 CSWITCH = ['WSC3850','C930024S']
 HOSTS = "hosts_brugge.csv"
-
-# Environment Variables
-SSH_USER = os.getenv("SSH_USER")
-SSH_PWD = os.getenv("SSH_PWD")
+# Number of devices queried at the same time, the logins are rate limited in Connection.py
+MAX_WORKERS = 10
 
 # Initialize logging
 logging.basicConfig(filename='error.log', level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
 # logging.basicConfig(filename='error.log', level=logging.DEBUG, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Check if all required environment variables are set
-if not all([SSH_USER, SSH_PWD, SSH_PORT]):
-    logger.error("One or more environment variables are not set")
-    exit(1)
-
 # Create dictionary from the different platform types for using the correct image for graph nodes
 platform = {value: 'aswitch' for value in ASWITCH}
 platform.update({value: 'cswitch' for value in CSWITCH})
@@ -46,51 +41,16 @@ icons = {
     "PC": "icons/pc.png",
 }
 
-def establish_connection(device):
-    """Establishes a connection to a network device."""
-    driver = None
-    if device["platform"] == "iosxe":
-        driver = IOSXEDriver
-    elif device["platform"] == "nxos":
-        driver = NXOSDriver
-    elif device["platform"] == "iosxr":
-        driver = IOSXRDriver
-    else:
-        logger.error(f"Unsupported platform: {device['platform']}")
-        return None
-
-    try:
-        conn = driver(
-            host=device["ip_address"],
-            auth_username=SSH_USER,
-            auth_password=SSH_PWD,
-            auth_strict_key=False,
-            ssh_config_file="~/.ssh/config",
-        )
-        conn.open()
-        if conn.isalive():
-            return conn
-        else:
-            logger.error(f"Connection to {device['hostname']} is not alive.")
-    except Exception as e:
-        logger.error(f"Error occurred while establishing connection with {device['ip_address']}: {str(e)}")
-        return None
-
-def close_connection(conn):
-    """Closes a connection to a network device."""
-    if conn:
-        conn.close()
-
 def lookup_icon(type_device):
     """Returns the appropriate icon for a given device type."""
     icon_key = platform.get(type_device, "router")
     return icon_key
 
-def extract_location(location):
-    """Extracts location from the hostname."""
+def extract_location(hosts_file):
+    """Extracts location from the hosts file name."""
     try:
         # Attempt to extract the location by splitting on underscore and period.
-        location = HOSTS.split("_", 1)[1].rsplit(".", 1)[0]
+        location = os.path.basename(hosts_file).split("_", 1)[1].rsplit(".", 1)[0]
     except IndexError:
         # If splitting fails, return a message indicating an issue.
         return "unknown-location"
@@ -112,6 +72,7 @@ def get_neighbors(device):
         logger.error(f"Unsupported platform: {device['platform']}")
     neighbors = []
     try:
+        from ntc_templates.parse import parse_output
         show_command = "show cdp neighbors"
         response_neighbors = conn.send_command(show_command).result
         parsed_output = parse_output(platform=ntc, command="show cdp neighbors", data=response_neighbors)
@@ -126,23 +87,26 @@ def get_neighbors(device):
         close_connection(conn)
     return neighbors
 
-def build_network_topology(devices):
-    """Builds the network topology graph."""
+def build_network_topology(devices, neighbor_source=get_neighbors):
+    """Builds the network topology graph, neighbor_source returns the CDP neighbors of a device."""
+    import networkx as nx
     G = nx.MultiGraph()  # Use MultiGraph to support multiple edges
     added_devices = set()
     seen_connections = set()  # Track seen connections to prevent duplicates
 
-    for device in devices:
-        neighbors = get_neighbors(device)
+    # Fetch the neighbors of all devices concurrently, the graph is built in the original order
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        all_neighbors = list(executor.map(neighbor_source, devices))
+
+    for device, neighbors in zip(devices, all_neighbors):
         hostname = device["hostname"].split(".")[0].lower()
         type_device = device["type"].replace("-", "")
         icon_key = lookup_icon(type_device)
 
-        # Add the device node if not already added
-        if hostname not in added_devices:
-            G.add_node(hostname, image=icon_key)
-            added_devices.add(hostname)
-            logger.debug(f"Adding Node: {hostname}, Icon: {icon_key}")
+        # Add the device node, the type of its own hosts row replaces the CDP platform of an earlier neighbor entry
+        G.add_node(hostname, image=icon_key)
+        added_devices.add(hostname)
+        logger.debug(f"Adding Node: {hostname}, Icon: {icon_key}")
 
         # Iterate through each neighbor to add edges and neighbor nodes
         for neighbor in neighbors:
@@ -163,16 +127,29 @@ def build_network_topology(devices):
 
             # Add an edge if this connection has not been seen before
             if connection_identifier not in seen_connections:
-                G.add_edge(hostname, remote_device, key=connection_identifier, local_interface=local_interface, remote_interface=remote_interface)
+                G.add_edge(hostname, remote_device, key=connection_identifier, local_device=hostname,
+                           local_interface=local_interface, remote_interface=remote_interface)
                 seen_connections.add(connection_identifier)
                 logger.debug(f"Adding Edge: {hostname} - {remote_device}, Interfaces: {local_interface} - {remote_interface}")
 
     return G
 
 
+def topology_file(hosts_file=HOSTS):
+    """Returns the file name of the saved topology graph of a hosts file."""
+    return extract_location(hosts_file) + '_topology.pickle'
+
+def save_topology(network_topology, hosts_file=HOSTS):
+    """Saves the topology graph, TopologyQuery.py answers path and downstream queries from it."""
+    output_file = topology_file(hosts_file)
+    with open(output_file + '.tmp', 'wb') as file:
+        pickle.dump(network_topology, file)
+    os.replace(output_file + '.tmp', output_file)
+    return output_file
 
-def visualize_network_topology(network_topology):
+def visualize_network_topology(network_topology, hosts_file=HOSTS):
     """Visualizes the network topology using pyvis."""
+    from pyvis.network import Network
     nt = Network(notebook=True, width="1500px", height="1000px")
 
     if not network_topology.nodes():
@@ -210,30 +187,39 @@ def visualize_network_topology(network_topology):
         nt.add_edge(u, v, title=label)
 
     nt.show_buttons(filter_=['physics'])
-    location = extract_location(HOSTS)
+    location = extract_location(hosts_file)
     nt.show(location + '_network_topology.html')
 
 
-def main():
+def main(argv=None):
     """Main execution function."""
+    parser = argparse.ArgumentParser(description="Build the network topology from the CDP neighbors.")
+    parser.add_argument("--hosts", default=HOSTS, help="CSV file with the device details")
+    args = parser.parse_args(argv)
+
+    # Check if all required environment variables are set
+    if not check_environment():
+        exit(1)
+
     devices = []
     try:
-        with open(HOSTS, "r") as file:
+        with open(args.hosts, "r") as file:
             csv_reader = csv.DictReader(file)
             for row in csv_reader:
                 devices.append(row)
     except FileNotFoundError:
-        logger.error(f"{HOSTS} file not found.")
+        logger.error(f"{args.hosts} file not found.")
         return
     except Exception as e:
-        logger.error(f"Error occurred while reading the {HOSTS} file: {str(e)}")
+        logger.error(f"Error occurred while reading the {args.hosts} file: {str(e)}")
         return
 
     try:
         network_topology = build_network_topology(devices)
-        visualize_network_topology(network_topology)
+        save_topology(network_topology, args.hosts)
+        visualize_network_topology(network_topology, args.hosts)
     except Exception as e:
         logger.error(f"Error occurred in main flow: {str(e)}")
 
 if __name__ == "__main__":
-    main()  
\ No newline at end of file
+    main()
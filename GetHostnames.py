@@ -4,92 +4,143 @@
 # please note there is a requirements file -> pip install -r requirements.txt
 # this script fetches the correct hostname and updates the input csv file
 # input csv file format is ip_address,name,platform
+# The hostnames are learned concurrently from the prompt scrapli detects at login,
+# the csv file is written once at the end. Learned hostnames are cached per IP
+# address so devices that did not change are skipped on the next run.
+# usage : python GetHostnames.py --hosts hosts.csv [--refresh] [--source config]
 
 import os
 import csv
+import json
 import logging
-from scrapli.driver.core import IOSXEDriver, NXOSDriver, IOSXRDriver
-
-# Constants
-SSH_PORT = int(os.getenv("SSH_PORT", 22))
-
-# Environment Variables 
-SSH_USER = os.getenv("SSH_USER")
-SSH_PWD = os.getenv("SSH_PWD")
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from RunLog import setup_logging
+from Connection import check_environment, establish_connection, close_connection, set_transport, SYNC_TRANSPORTS
 
 logging.basicConfig(filename='error.log', level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Check if all required environment variables are set
-if not all([SSH_USER, SSH_PWD, SSH_PORT]):
-    logger.error("One or more environment variables are not set")
-    exit(1)
-
 # Define the CSV file path containing the device details
 csv_file = 'hosts_arlon.csv'
 
-# Create a list to store the devices
-devices = []
-
-# Read the CSV file and populate the devices list
-with open(csv_file, 'r') as file:
-    reader = csv.DictReader(file)
-    for row in reader:
-        devices.append(row)
-
-# Iterate over the devices
-    for device in devices:
-        # Connect to the device using Scrapli
-        driver = None
-        if device["platform"] == "iosxe":
-            driver = IOSXEDriver
-            hostname_line = 0  # Line index for IOS XE
-        elif device["platform"] == "nxos":
-            driver = NXOSDriver
-            hostname_line = 0 # Line index for NX-OS
-        elif device["platform"] == "iosxr":
-            driver = IOSXRDriver
-            hostname_line = 2  # Line index for IOS XR
-
-       
-        try:
-            conn = driver(
-                host=device["ip_address"],
-                auth_username=SSH_USER,
-                auth_password=SSH_PWD,
-                auth_strict_key=False,
-                ssh_config_file="~/.ssh/config",
-            )
-            conn.open()
-            if conn.isalive():
-                # Send the command to retrieve the hostname
-                response = conn.send_command('show running-config | include hostname')
-
-                # Split the response into lines
-                lines = response.result.splitlines()
-                print(lines)
-
-                # Extract the hostname from the appropriate line
-                hostname = lines[hostname_line].split()[1]
-
-                # Update the 'hostname' field in the device dictionary
-                device['hostname'] = hostname
-
-                # Close the SSH session
-                conn.close()
-
-                # Update the input CSV file with the hostname
-                fieldnames = ['ip_address',  'hostname', 'platform', 'type']
-                with open(csv_file, 'w', newline='') as file:
-                    writer = csv.DictWriter(file, fieldnames=fieldnames)
-                    writer.writeheader()
-                    writer.writerows(devices)
-
-                # Print a success message
-                print(f'Hostname information updated in {csv_file} successfully.')
-            else:
-                logger.error(f"Connection to {device['name']} is not alive.")
-
-        except Exception as e:
-            logger.error(f"Error occurred while establishing connection with {device['ip_address']}: {str(e)}")
-       
\ No newline at end of file
+# Cache with the hostname learned per IP address
+cache_file = 'hostname_cache.json'
+
+# Number of devices queried at the same time
+MAX_WORKERS = 20
+
+# Line index of the hostname in the output of show running-config | include hostname
+HOSTNAME_LINES = {
+    "iosxe": 0,
+    "nxos": 0,
+    "iosxr": 2,
+}
+
+def hostname_from_prompt(prompt):
+    """Extracts the hostname from a prompt such as HOST# or RP/0/RSP0/CPU0:HOST#."""
+    hostname = prompt.strip().rstrip("#>").strip()
+    return hostname.rsplit(":", 1)[-1]
+
+def hostname_from_config(conn, platform):
+    """Reads the hostname from the running configuration."""
+    response = conn.send_command('show running-config | include hostname')
+    lines = response.result.splitlines()
+    return lines[HOSTNAME_LINES.get(platform, 0)].split()[1]
+
+def learn_hostname(device, source="prompt"):
+    """Connects to a device and returns its hostname, or None on failure."""
+    conn = establish_connection(device)
+    if not conn:
+        return None
+    try:
+        if source == "config":
+            return hostname_from_config(conn, device["platform"])
+        return hostname_from_prompt(conn.get_prompt())
+    except Exception as e:
+        logger.error(f"Error occurred while getting the hostname of {device['ip_address']}: {str(e)}")
+        return None
+    finally:
+        close_connection(conn)
+
+def load_cache(input_file):
+    """Loads the IP address to hostname cache."""
+    if not os.path.exists(input_file):
+        return {}
+    with open(input_file, 'r') as file:
+        return json.load(file)
+
+def save_cache(cache, output_file):
+    """Saves the IP address to hostname cache."""
+    temp_file = output_file + '.tmp'
+    with open(temp_file, 'w') as file:
+        json.dump(cache, file, indent=2, sort_keys=True)
+    os.replace(temp_file, output_file)
+
+def write_devices(devices, fieldnames, output_file):
+    """Writes the devices to a temporary file and moves it in place, so the CSV file is never half written."""
+    temp_file = output_file + '.tmp'
+    with open(temp_file, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(devices)
+    os.replace(temp_file, output_file)
+
+def update_hostnames(devices, cache, refresh=False, source="prompt"):
+    """Learns the hostnames concurrently and updates the devices and the cache, returns the # of updated devices."""
+    # Devices with a cached hostname that is already in the CSV file are skipped
+    todo = [
+        device for device in devices
+        if refresh or not device.get('hostname') or cache.get(device['ip_address']) != device.get('hostname')
+    ]
+    print(f"{len(devices) - len(todo)} devices unchanged, querying {len(todo)} devices.")
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        hostnames = list(executor.map(lambda device: learn_hostname(device, source), todo))
+
+    updated = 0
+    for device, hostname in zip(todo, hostnames):
+        if hostname is None:
+            continue
+        device['hostname'] = hostname
+        cache[device['ip_address']] = hostname
+        updated += 1
+    return updated
+
+def main(argv=None):
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Update the hostnames in the hosts CSV file.")
+    parser.add_argument("--hosts", default=csv_file, help="CSV file with the device details")
+    parser.add_argument("--refresh", action="store_true", help="query all devices, also the cached ones")
+    parser.add_argument("--source", choices=["prompt", "config"], default="prompt", help="learn the hostname from the prompt or the config")
+    parser.add_argument("--transport", choices=SYNC_TRANSPORTS, help="SSH transport of this run, overrides SSH_TRANSPORT")
+    args = parser.parse_args(argv)
+    setup_logging()
+
+    if args.transport:
+        set_transport(args.transport)
+
+    # Check if all required environment variables are set
+    if not check_environment():
+        exit(1)
+
+    # Read the CSV file and populate the devices list
+    with open(args.hosts, 'r') as file:
+        reader = csv.DictReader(file)
+        devices = list(reader)
+        fieldnames = list(reader.fieldnames)
+    if 'hostname' not in fieldnames:
+        fieldnames.append('hostname')
+
+    cache = load_cache(cache_file)
+    updated = update_hostnames(devices, cache, args.refresh, args.source)
+
+    # Update the input CSV file with the hostnames in one write
+    write_devices(devices, fieldnames, args.hosts)
+    save_cache(cache, cache_file)
+
+    # Print a success message
+    print(f'Hostname information of {updated} devices updated in {args.hosts} successfully.')
+
+if __name__ == "__main__":
+    main()
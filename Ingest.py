@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+# created by Alexander Deca - Deca Consulting 06/07/2023
+# please note there is a requirements file -> pip install -r requirements.txt
+# this script incrementally ingests the show mac address-table and show version
+# outputs of every output_{date} snapshot into a dated MAC and version history.
+# Only complete snapshots are ingested, not output_synthetic or the partial shard snapshots.
+# A manifest keeps track of the files already processed (path, size, mtime, hash)
+# so only new or changed files are parsed on the next run.
+# usage : python Ingest.py                      -> ingest new snapshots
+#         python Ingest.py --mac aabb.ccdd.eeff -> show when a MAC address moved
+#         python Ingest.py --host HOST1         -> show when a software version changed
+
+import os
+import csv
+import logging
+import argparse
+import MacLookup
+import SaveVersion
+from Locate import normalize_mac
+from Manifest import file_digest, find_snapshots, load_manifest, save_manifest
+
+logging.basicConfig(filename='error.log', level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Specify the directory containing the output_{date} snapshots created by SaveInfo.py
+directory_path = "."
+
+# Specify the manifest and history CSV file paths
+manifest_file = "IngestManifest.csv"
+mac_history_file = "MacHistory.csv"
+version_history_file = "VersionHistory.csv"
+
+MAC_HISTORY_FIELDS = ["date", "host", "mac_address", "interface", "mac_type", "vlan", "vendor"]
+VERSION_HISTORY_FIELDS = ["date", "hostname", "type", "software version", "software image"]
+
+
+def check_file(file_path, manifest):
+    """Returns the new manifest row when the file is new or changed, otherwise None.
+
+    Size and mtime are compared first, the file is only hashed when one of them differs.
+    """
+    stat = os.stat(file_path)
+    known = manifest.get(file_path)
+    if known and int(known["size"]) == stat.st_size and float(known["mtime"]) == stat.st_mtime:
+        return None
+    row = {"path": file_path, "size": stat.st_size, "mtime": stat.st_mtime, "sha256": file_digest(file_path)}
+    if known and known["sha256"] == row["sha256"]:
+        # Touched but identical, only refresh the manifest entry
+        manifest[file_path] = row
+        return None
+    return row
+
+
+def open_history(history_file, fieldnames):
+    """Opens a history CSV file for appending, writing the header for a new file."""
+    new_file = not os.path.exists(history_file)
+    file = open(history_file, "a", newline="")
+    writer = csv.writer(file)
+    if new_file:
+        writer.writerow(fieldnames)
+    return file, writer
+
+
+def ingest(directory, manifest_path, mac_history, version_history):
+    """Parses new or changed snapshot files and appends them to the history files."""
+    manifest = load_manifest(manifest_path)
+    mac_file, mac_writer = open_history(mac_history, MAC_HISTORY_FIELDS)
+    version_file, version_writer = open_history(version_history, VERSION_HISTORY_FIELDS)
+    processed = 0
+
+    try:
+        for snapshot_date, snapshot in find_snapshots(directory):
+            date = snapshot_date.strftime("%Y-%m-%d")
+            # The manifest keeps the paths relative to the current directory, e.g. output_{date}/...
+            for root, dirs, files in os.walk(os.path.normpath(snapshot)):
+                for file in files:
+                    is_mac = file.startswith("show_mac") and file.endswith(".txt")
+                    is_version = file.startswith("show_version") and file.endswith(".txt")
+                    if not (is_mac or is_version):
+                        continue
+                    file_path = os.path.join(root, file)
+                    try:
+                        row = check_file(file_path, manifest)
+                        if row is None:
+                            continue
+                        with open(file_path, "r") as f:
+                            output = f.read()
+                        if is_mac:
+                            host = os.path.basename(root).split("_")[0]
+                            for entry in MacLookup.parse_cisco_show_output(output):
+                                mac_writer.writerow([date, host] + entry)
+                        else:
+                            version_writer.writerow([date] + list(SaveVersion.parse_cisco_show_output(output)))
+                        manifest[file_path] = row
+                        processed += 1
+                    except Exception as e:
+                        logger.error(f"Failed to ingest file {file_path}: {e}")
+    finally:
+        mac_file.close()
+        version_file.close()
+        save_manifest(manifest, manifest_path)
+
+    return processed
+
+
+def read_history(history_file, key, value):
+    """Returns the history rows where the given column matches, sorted by date."""
+    with open(history_file, "r", newline="") as file:
+        rows = [row for row in csv.DictReader(file) if row[key].lower() == value.lower()]
+    return sorted(rows, key=lambda row: row["date"])
+
+
+def find_changes(rows, fields):
+    """Returns (date, previous, current) for every date where the set of field values changed."""
+    per_date = {}
+    for row in rows:
+        per_date.setdefault(row["date"], set()).add(tuple(row[field] for field in fields))
+
+    changes = []
+    previous = None
+    for date in sorted(per_date):
+        current = per_date[date]
+        if previous is not None and current != previous:
+            changes.append((date, sorted(previous), sorted(current)))
+        previous = current
+    return changes
+
+
+def mac_moves(history_file, mac_address):
+    """Returns the dates where a MAC address was seen on a different host, interface or VLAN."""
+    mac_address = normalize_mac(mac_address) or mac_address
+    return find_changes(read_history(history_file, "mac_address", mac_address), ["host", "interface", "vlan"])
+
+
+def version_changes(history_file, hostname):
+    """Returns the dates where the software version or image of a host changed."""
+    return find_changes(read_history(history_file, "hostname", hostname), ["software version", "software image"])
+
+
+def print_changes(changes):
+    """Prints the output of find_changes."""
+    if not changes:
+        print("No changes found.")
+    for date, previous, current in changes:
+        print(f"{date}: {previous} -> {current}")
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Ingest new snapshots into the MAC and version history.")
+    parser.add_argument("--mac", help="show when this MAC address moved")
+    parser.add_argument("--host", help="show when the software version of this host changed")
+    args = parser.parse_args()
+
+    if args.mac:
+        print_changes(mac_moves(mac_history_file, args.mac))
+    elif args.host:
+        print_changes(version_changes(version_history_file, args.host))
+    else:
+        processed = ingest(directory_path, manifest_file, mac_history_file, version_history_file)
+        print(f"Ingested {processed} new or changed files.")
+
+if __name__ == "__main__":
+    main()
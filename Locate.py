@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+
+# created by Alexander Deca - Deca Consulting 06/07/2023
+# please note there is a requirements file -> pip install -r requirements.txt
+# this script locates the access port where a MAC address is really connected.
+# It combines the MacInfo.csv file created by MacLookup.py with the saved
+# show cdp neighbor outputs so uplinks and trunks towards other switches are
+# ignored. The MAC addresses are looked up in an index that can be saved and
+# reused, so thousands of MAC addresses can be resolved in one call.
+# usage : python Locate.py aabb.ccdd.eeff 00:11:22:33:44:55 --file macs.txt
+
+import os
+import re
+import sys
+import csv
+import json
+import logging
+import argparse
+
+logging.basicConfig(filename='error.log', level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Specify the directory path containing the subdirectories with show command output
+directory_path = "output"
+
+# Specify the MAC address CSV file created by MacLookup.py
+mac_csv_file = "MacInfo.csv"
+
+# Specify the file used to store the prebuilt index
+index_file = "LocateIndex.json"
+
+# Interface names as used by CDP and the MAC address table are reduced to the same short form
+INTERFACE_PREFIXES = {
+    "gigabitethernet": "gi",
+    "gig": "gi",
+    "gi": "gi",
+    "twogigabitethernet": "tw",
+    "two": "tw",
+    "tw": "tw",
+    "fivegigabitethernet": "fi",
+    "fiv": "fi",
+    "fi": "fi",
+    "tengigabitethernet": "te",
+    "ten": "te",
+    "te": "te",
+    "twentyfivegige": "twe",
+    "twe": "twe",
+    "fortygigabitethernet": "fo",
+    "for": "fo",
+    "fo": "fo",
+    "hundredgige": "hu",
+    "hun": "hu",
+    "hu": "hu",
+    "fastethernet": "fa",
+    "fas": "fa",
+    "fa": "fa",
+    "ethernet": "eth",
+    "eth": "eth",
+    "et": "eth",
+    "portchannel": "po",
+    "port-channel": "po",
+    "po": "po",
+}
+
+INTERFACE_RE = re.compile(r"^([a-z-]+)\s*(\d.*)$")
+MAC_CHARS_RE = re.compile(r"[^0-9a-f]")
+
+
+def normalize_mac(mac_address):
+    """Returns the MAC address in the Cisco aabb.ccdd.eeff notation or None when invalid."""
+    digits = MAC_CHARS_RE.sub("", mac_address.lower())
+    if len(digits) != 12:
+        return None
+    return f"{digits[0:4]}.{digits[4:8]}.{digits[8:12]}"
+
+
+def normalize_interface(interface):
+    """Returns a short lowercase interface name, e.g. 'Gig 1/0/1' becomes 'gi1/0/1'."""
+    name = interface.strip().lower()
+    match = INTERFACE_RE.match(name)
+    if not match:
+        return name
+    prefix, number = match.groups()
+    return INTERFACE_PREFIXES.get(prefix, prefix[:2]) + number.replace(" ", "")
+
+
+def is_switch_port(interface):
+    """Returns True when the interface is a physical or logical port, not CPU/Router/Switch entries."""
+    return INTERFACE_RE.match(interface.strip().lower()) is not None
+
+
+def host_from_directory(root):
+    """Returns the hostname for a <hostname>_output directory, the same way MacLookup.py does."""
+    return os.path.basename(root).split("_")[0]
+
+
+def is_cdp_file(file):
+    """Returns True for a saved show cdp neighbors output, the detail output is not needed."""
+    return file.startswith("show_cdp_neighbor") and file.endswith(".txt") and "detail" not in file
+
+
+def newest_cdp_mtime(directory):
+    """Returns the modification time of the newest saved CDP output in directory, or 0."""
+    newest = 0
+    for root, dirs, files in os.walk(directory):
+        for file in files:
+            if is_cdp_file(file):
+                newest = max(newest, os.path.getmtime(os.path.join(root, file)))
+    return newest
+
+
+def load_uplinks(directory):
+    """Returns a set of (host, interface) tuples that have a CDP neighbor."""
+    from ntc_templates.parse import parse_output
+    uplinks = set()
+    for root, dirs, files in os.walk(directory):
+        for file in files:
+            if not is_cdp_file(file):
+                continue
+            file_path = os.path.join(root, file)
+            host = host_from_directory(root)
+            try:
+                with open(file_path, "r") as f:
+                    parsed_output = parse_output(platform="cisco_ios", command="show cdp neighbors", data=f.read())
+            except Exception as e:
+                logger.error(f"Failed to parse CDP neighbors in {file_path}: {e}")
+                continue
+            for neighbor in parsed_output:
+                uplinks.add((host, normalize_interface(neighbor["local_interface"])))
+    return uplinks
+
+
+def load_mac_rows(csv_file):
+    """Returns the rows of the MacLookup.py CSV file as a list of dictionaries."""
+    with open(csv_file, "r", newline="") as file:
+        return list(csv.DictReader(file))
+
+
+def build_index(mac_rows, uplinks):
+    """Builds a dictionary mapping every MAC address to its edge port.
+
+    Ports with a CDP neighbor are dropped. When a MAC address is still seen on
+    more than one port, the port with the fewest learned MAC addresses wins, as
+    that is the port closest to the end device.
+    """
+    port_counts = {}
+    candidates = {}
+    for row in mac_rows:
+        if not is_switch_port(row["interface"]):
+            continue
+        port = (row["host"], normalize_interface(row["interface"]))
+        port_counts[port] = port_counts.get(port, 0) + 1
+        if port in uplinks:
+            continue
+        mac_address = normalize_mac(row["mac_address"])
+        if mac_address:
+            candidates.setdefault(mac_address, []).append(row)
+
+    index = {}
+    for mac_address, rows in candidates.items():
+        best = min(rows, key=lambda row: port_counts[(row["host"], normalize_interface(row["interface"]))])
+        index[mac_address] = {
+            "host": best["host"],
+            "interface": best["interface"],
+            "vlan": best["vlan"],
+            "vendor": best["vendor"],
+            "mac_count": port_counts[(best["host"], normalize_interface(best["interface"]))],
+        }
+    return index
+
+
+def save_index(index, output_file):
+    """Saves the index to a JSON file."""
+    with open(output_file, "w") as file:
+        json.dump(index, file)
+
+
+def load_index(input_file):
+    """Loads an index saved by save_index."""
+    with open(input_file, "r") as file:
+        return json.load(file)
+
+
+def get_index(csv_file, directory, cached_file, rebuild=False):
+    """Returns the saved index, rebuilding it when the MAC address CSV file or a CDP output is newer."""
+    if not rebuild and os.path.exists(cached_file):
+        # The uplinks come from the CDP outputs, a new snapshot can change them without a new CSV file
+        if os.path.getmtime(cached_file) >= max(os.path.getmtime(csv_file), newest_cdp_mtime(directory)):
+            return load_index(cached_file)
+    index = build_index(load_mac_rows(csv_file), load_uplinks(directory))
+    save_index(index, cached_file)
+    return index
+
+
+def locate(index, mac_addresses):
+    """Looks up a list of MAC addresses, returns a dictionary with the edge port or None."""
+    results = {}
+    for mac_address in mac_addresses:
+        normalized = normalize_mac(mac_address)
+        results[mac_address] = index.get(normalized) if normalized else None
+    return results
+
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Locate the access port of one or more MAC addresses.")
+    parser.add_argument("mac_addresses", nargs="*", help="MAC addresses in any common notation")
+    parser.add_argument("--file", help="file with one MAC address per line")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the index even if it is up to date")
+    args = parser.parse_args()
+
+    mac_addresses = list(args.mac_addresses)
+    if args.file:
+        with open(args.file, "r") as file:
+            mac_addresses.extend(line.strip() for line in file if line.strip())
+
+    try:
+        index = get_index(mac_csv_file, directory_path, index_file, rebuild=args.rebuild)
+    except Exception as e:
+        logger.error(f"Failed to build the locate index: {e}")
+        return
+
+    writer = csv.writer(sys.stdout)
+    writer.writerow(["mac_address", "host", "interface", "vlan", "vendor", "mac_count"])
+    for mac_address, result in locate(index, mac_addresses).items():
+        if result is None:
+            writer.writerow([mac_address, "not found", "", "", "", ""])
+        else:
+            writer.writerow([mac_address, result["host"], result["interface"], result["vlan"], result["vendor"], result["mac_count"]])
+
+if __name__ == "__main__":
+    main()
@@ -5,20 +5,105 @@
 # this script is a utility for network administrators to process and analyze the MAC addresses learned on a Cisco device
 # and by consolidating them into a single CSV file. It uses specific libraries (ntc_templates and manuf) to facilitate 
 # parsing and MAC address vendor lookup.
+# ntc_templates and manuf are only imported when they are needed.
+# usage : python MacLookup.py --directory output --output MacInfo.csv
 
 import os
+import re
 import csv
-from ntc_templates.parse import parse_output
-import manuf
 import logging
+import argparse
 
 logging.basicConfig(filename='error.log', level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Set to False to always parse the MAC address tables with ntc-templates
+FAST_PARSER = True
+
+# Regular expressions for the fast path parser, they follow the ntc-templates rules for
+# the IOS/IOS-XE "Vlan Mac Address Type Ports" format and the NX-OS format
+MAC = r"[0-9a-fA-F]{4}\.[0-9a-fA-F]{4}\.[0-9a-fA-F]{4}"
+IOS_HEADER_RE = re.compile(r"^Vlan\s+Mac Address\s+Type\s+Ports.*$", re.M)
+IOS_OTHER_HEADER_RE = re.compile(
+    r"^(?:Destination\s+Address\s+Address\s+Type|\s+vlan\s+mac address\s+type\s+(?:learn|protocols))", re.M)
+IOS_END_RE = re.compile(r"^MultiCast\s+Entries", re.M)
+IOS_ROW_RE = re.compile(rf"^[^\S\n]*(\S+)[^\S\n]+({MAC})[^\S\n]+(\S+)[^\S\n]+([^,\s]+)(?=\s|$)", re.M)
+IOS_IGNORED_RE = re.compile(
+    r"^(?:-+[^\S\n]+-+|Displaying[^\S\n]+entries|Vlan[^\S\n]+Mac Address[^\S\n]+Type[^\S\n]+Ports|Total[^\S\n]+Mac[^\S\n]+Addresses)", re.M)
+NXOS_HEADER_RE = re.compile(r"^.*VLAN\s+MAC\s+Address\s+Type\s+age\s+Secure\s+NTFY\s+Ports.*$", re.M)
+NXOS_ROW_RE = re.compile(
+    rf"^[^\S\n]*(?:[*+GRCO~]+[^\S\n]+)?(\S+)[^\S\n]+({MAC})[^\S\n]+(\S+)[^\S\n]+\S+[^\S\n]+[TF][^\S\n]+[TF][^\S\n]+(\S+)", re.M)
+NXOS_IGNORED_RE = re.compile(r"^-+\+", re.M)
+NON_BLANK_LINE_RE = re.compile(r"^[^\S\n]*\S", re.M)
+
+# The MAC vendor database is loaded once and reused for every file
+mac_parser = None
+
+
+def get_mac_parser():
+    """Returns the manuf MAC vendor parser, loading it on first use."""
+    global mac_parser
+    if mac_parser is None:
+        import manuf
+        mac_parser = manuf.MacParser()
+    return mac_parser
+
+
+def fast_parse_mac_table(output):
+    """Parses a show mac address-table output with a single regular expression pass.
+
+    Returns the entries in the same format as ntc-templates, or None when the output
+    contains a format or line that is not recognised so the caller can fall back.
+    """
+    if IOS_OTHER_HEADER_RE.search(output):
+        return None
+
+    header = IOS_HEADER_RE.search(output)
+    if header:
+        body = output[header.end():]
+        end = IOS_END_RE.search(body)
+        if end:
+            body = body[:end.start()]
+        row_re, ignored_re = IOS_ROW_RE, IOS_IGNORED_RE
+    else:
+        header = NXOS_HEADER_RE.search(output)
+        if not header:
+            return None
+        body = output[header.end():]
+        row_re, ignored_re = NXOS_ROW_RE, NXOS_IGNORED_RE
+
+    entries = [
+        {"destination_address": mac_address, "type": mac_type, "vlan": vlan, "destination_port": [port]}
+        for vlan, mac_address, mac_type, port in row_re.findall(body)
+    ]
+
+    # Every non-blank line has to be an entry or a line the template skips
+    if len(NON_BLANK_LINE_RE.findall(body)) != len(entries) + len(ignored_re.findall(body)):
+        return None
+    return entries
+
+
+def parse_mac_table(output):
+    """Parses a show mac address-table output, using the fast path parser when possible."""
+    if FAST_PARSER:
+        entries = fast_parse_mac_table(output)
+        if entries is not None:
+            return entries
+
+    from ntc_templates.parse import parse_output
+    if NXOS_HEADER_RE.search(output):
+        result = parse_output(platform="cisco_nxos", command="show mac address-table", data=output)
+        return [
+            {"destination_address": entry["mac"], "type": entry["type"], "vlan": entry["vlan"], "destination_port": [entry["ports"]]}
+            for entry in result
+        ]
+    return parse_output(platform="cisco_ios", command="show mac address-table", data=output)
+
+
 def parse_cisco_show_output(output):
     try:
-        # Parse the show command output using ntc-templates
-        result = parse_output(platform="cisco_ios", command="show mac address-table", data=output)
+        # Parse the show command output, ntc-templates is used for formats the fast path does not know
+        result = parse_mac_table(output)
     except Exception as e:
         logger.error(f"Failed to parse output: {e}")
         return []
@@ -26,12 +111,12 @@ def parse_cisco_show_output(output):
     parsed_results = []  # List to store parsed results
 
     try:
-        mlookup = manuf.MacParser()
+        mlookup = get_mac_parser()
 
         for entry in result:
             mac_address = entry["destination_address"]
             interface = entry["destination_port"][0]
-            mac_type = entry["type"][0]
+            mac_type = entry["type"][0].upper()
             vlan = entry["vlan"]
             vendor = mlookup.get_manuf(mac_address)
 
@@ -79,8 +164,18 @@ directory_path = "output"
 # Specify the output CSV file path
 output_csv_file = "MacInfo.csv"
 
-try:
-    # Review the directory and save the output in CSV format
-    review_directory(directory_path, output_csv_file)
-except Exception as e:
-    logger.error(f"Failed to review directory and save output: {e}")
+def main(argv=None):
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Collect the MAC address tables of a snapshot in one CSV file.")
+    parser.add_argument("--directory", default=directory_path, help="directory with the show command outputs")
+    parser.add_argument("--output", default=output_csv_file, help="output CSV file")
+    args = parser.parse_args(argv)
+
+    try:
+        # Review the directory and save the output in CSV format
+        review_directory(args.directory, args.output)
+    except Exception as e:
+        logger.error(f"Failed to review directory and save output: {e}")
+
+if __name__ == "__main__":
+    main()
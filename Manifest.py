@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+
+# created by Alexander Deca - Deca Consulting 06/07/2023
+# please note there is a requirements file -> pip install -r requirements.txt
+# this module contains the manifest handling shared by the scripts.
+# A manifest is a csv file with one row per file : path,size,mtime,sha256
+# Every output_{date} snapshot has a manifest.csv with the paths relative to the snapshot.
+
+import os
+import re
+import csv
+import hashlib
+from datetime import datetime
+
+MANIFEST_FIELDS = ["path", "size", "mtime", "sha256"]
+
+# File name of the manifest inside a snapshot directory
+SNAPSHOT_MANIFEST = "manifest.csv"
+
+# Complete snapshots only, the partial snapshots of the shards and output_synthetic are left alone
+SNAPSHOT_RE = re.compile(r"^output_(\d{4}-\d{2}-\d{2})$")
+
+def file_digest(file_path):
+    """Returns the sha256 hash of a file."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def manifest_row(file_path, path=None):
+    """Returns the manifest row of a file, path is the name stored in the manifest."""
+    stat = os.stat(file_path)
+    return {"path": path or file_path, "size": stat.st_size, "mtime": stat.st_mtime, "sha256": file_digest(file_path)}
+
+def load_manifest(input_file):
+    """Loads a manifest as a dictionary keyed on file path."""
+    if not os.path.exists(input_file):
+        return {}
+    with open(input_file, "r", newline="") as file:
+        return {row["path"]: row for row in csv.DictReader(file)}
+
+def save_manifest(manifest, output_file):
+    """Writes a manifest to a temporary file and moves it in place."""
+    temp_file = output_file + ".tmp"
+    with open(temp_file, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=MANIFEST_FIELDS)
+        writer.writeheader()
+        writer.writerows(manifest[path] for path in sorted(manifest))
+    os.replace(temp_file, output_file)
+
+def write_snapshot_manifest(snapshot_directory):
+    """Writes the manifest.csv of a snapshot directory and returns the manifest."""
+    manifest = {}
+    for root, dirs, files in os.walk(snapshot_directory):
+        for file in files:
+            if root == snapshot_directory and file.startswith(SNAPSHOT_MANIFEST):
+                continue
+            file_path = os.path.join(root, file)
+            path = os.path.relpath(file_path, snapshot_directory)
+            manifest[path] = manifest_row(file_path, path)
+    save_manifest(manifest, os.path.join(snapshot_directory, SNAPSHOT_MANIFEST))
+    return manifest
+
+def find_snapshots(directory):
+    """Returns the (date, snapshot directory) of the complete output_{date} snapshots, oldest first."""
+    snapshots = []
+    for name in os.listdir(directory):
+        match = SNAPSHOT_RE.match(name)
+        if match and os.path.isdir(os.path.join(directory, name)):
+            snapshots.append((datetime.strptime(match.group(1), "%Y-%m-%d").date(), os.path.join(directory, name)))
+    return sorted(snapshots)
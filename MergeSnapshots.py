@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+# created by Alexander Deca - Deca Consulting 06/07/2023
+# please note there is a requirements file -> pip install -r requirements.txt
+# this script merges the partial snapshots written by SaveInfo.py --shard i/N
+# (output_{date}_shard{i}of{N}) into one output_{date} snapshot with one manifest,
+# so SaveVersion.py, MacLookup.py and RunDiff.py see a single consistent snapshot.
+# The partial snapshots are copied from the other nodes to this machine first.
+# usage : python MergeSnapshots.py [--date 2023-10-29] [--copy]
+
+import os
+import glob
+import shutil
+import logging
+import argparse
+from datetime import datetime
+from Manifest import SNAPSHOT_MANIFEST, load_manifest, save_manifest
+
+logging.basicConfig(filename='error.log', level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def find_shards(date):
+    """Returns the partial snapshot directories of a date."""
+    return sorted(directory for directory in glob.glob(f"output_{date}_shard*of*") if os.path.isdir(directory))
+
+def check_complete(shards):
+    """Checks that every shard of the N shards is present, returns the missing shard names."""
+    expected = set()
+    for shard in shards:
+        count = shard.rsplit("of", 1)[1]
+        expected.update(f"{i}of{count}" for i in range(1, int(count) + 1))
+    present = {shard.rsplit("_shard", 1)[1] for shard in shards}
+    return sorted(expected - present)
+
+def merge_snapshots(shards, target, copy=False):
+    """Moves (or copies) the host directories of the shards into the target and merges the manifests."""
+    os.makedirs(target, exist_ok=True)
+    merged = load_manifest(os.path.join(target, SNAPSHOT_MANIFEST))
+    problems = []
+
+    for shard in shards:
+        shard_manifest = load_manifest(os.path.join(shard, SNAPSHOT_MANIFEST))
+        if not shard_manifest:
+            problems.append(f"{shard} has no manifest")
+
+        for entry in sorted(os.listdir(shard)):
+            source = os.path.join(shard, entry)
+            if entry.startswith(SNAPSHOT_MANIFEST):
+                continue
+            destination = os.path.join(target, entry)
+            if os.path.exists(destination):
+                # The same host in two shards means the nodes used different hosts files
+                problems.append(f"{entry} is present in more than one shard, kept the first one")
+                continue
+            if copy:
+                if os.path.isdir(source):
+                    shutil.copytree(source, destination, copy_function=shutil.copy2)
+                else:
+                    shutil.copy2(source, destination)
+            else:
+                shutil.move(source, destination)
+            for path, row in shard_manifest.items():
+                if path == entry or path.startswith(entry + os.sep):
+                    merged[path] = row
+
+    # Every file in the manifests has to be present with the same size
+    for path, row in merged.items():
+        file_path = os.path.join(target, path)
+        if not os.path.isfile(file_path) or os.path.getsize(file_path) != int(row["size"]):
+            problems.append(f"{path} is missing or has a different size than in the manifest")
+
+    save_manifest(merged, os.path.join(target, SNAPSHOT_MANIFEST))
+
+    if not copy:
+        for shard in shards:
+            remaining = [entry for entry in os.listdir(shard) if not entry.startswith(SNAPSHOT_MANIFEST)]
+            if not remaining:
+                shutil.rmtree(shard)
+
+    for problem in problems:
+        logger.error(f"Merge of {target}: {problem}")
+    return merged, problems
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Merge the partial snapshots of the shards into one snapshot.")
+    parser.add_argument("--date", default=datetime.now().strftime("%Y-%m-%d"), help="date of the snapshot to merge")
+    parser.add_argument("--copy", action="store_true", help="copy the shards instead of moving them")
+    args = parser.parse_args()
+
+    shards = find_shards(args.date)
+    if not shards:
+        print(f"No partial snapshots found for {args.date}.")
+        return
+    missing = check_complete(shards)
+    if missing:
+        print(f"Missing shards: {', '.join(missing)}")
+        logger.error(f"Missing shards for {args.date}: {', '.join(missing)}")
+
+    target = f"output_{args.date}"
+    merged, problems = merge_snapshots(shards, target, args.copy)
+    print(f"Merged {len(shards)} shards into {target}, {len(merged)} files, {len(problems)} problems.")
+
+if __name__ == "__main__":
+    main()
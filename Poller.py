@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+
+# created by Alexander Deca - Deca Consulting 06/07/2023
+# please note there is a requirements file -> pip install -r requirements.txt
+# this script is a long running poller built on the commands.csv model.
+# Every command has its own interval in seconds (second column of commands.csv),
+# e.g. show mac address-table every 5 minutes and show running-config daily.
+# The sessions to the devices are kept open with a keepalive and reopened when
+# they drop. The work is scheduled through a priority queue, shorter intervals
+# first, with a global limit on the number of commands running at the same time.
+# The output is saved in the same output_{date}/{hostname}_output tree as SaveInfo.py.
+# usage : python Poller.py --hosts hosts.csv --commands commands.csv --concurrency 20
+
+import os
+import csv
+import time
+import heapq
+import logging
+import argparse
+import threading
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from Connection import check_environment, load_devices, establish_connection, close_connection, set_transport, SYNC_TRANSPORTS
+from SaveInfo import output_filename, write_output
+from RunLog import setup_logging, timed_phase
+
+logging.basicConfig(filename='error.log', level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Define the CSV file paths containing the device details and the commands
+csv_file = 'hosts_brugge.csv'
+commands_csv_file = 'commands.csv'
+
+# Interval for commands without an interval column, in seconds
+DEFAULT_INTERVAL = 86400
+
+# Maximum number of commands running at the same time over all devices
+MAX_CONCURRENCY = 20
+
+# Idle sessions are checked after this many seconds
+KEEPALIVE_INTERVAL = 60
+
+def load_schedule(csv_file):
+    """Reads the (command, interval) pairs from the commands CSV file."""
+    schedule = []
+    with open(csv_file, 'r') as commands_file:
+        commands_reader = csv.reader(commands_file)
+        next(commands_reader)
+        for command_row in commands_reader:
+            if not command_row:
+                continue
+            interval = int(command_row[1]) if len(command_row) > 1 and command_row[1].strip() else DEFAULT_INTERVAL
+            schedule.append((command_row[0], interval))
+    return schedule
+
+class Session:
+    """A persistent session to one device, reopened when it dropped."""
+
+    def __init__(self, device):
+        self.device = device
+        self.conn = None
+        self.lock = threading.Lock()
+        self.last_used = 0
+        # Commands that became due while the session was busy
+        self.pending = []
+        self.busy = False
+
+    def send_command(self, command):
+        """Sends a command over the session, opening the session first when needed."""
+        with self.lock:
+            if self.conn is None:
+                self.conn = establish_connection(self.device)
+                if self.conn is None:
+                    raise ConnectionError(f"Could not connect to {self.device['hostname']}")
+            try:
+                response = self.conn.send_command(command)
+            except Exception:
+                # Drop the session, the next command reconnects
+                self.reset()
+                raise
+            self.last_used = time.monotonic()
+            return response
+
+    def keepalive(self):
+        """Checks an idle session by asking for the prompt, drops the session when it does not answer."""
+        if not self.lock.acquire(blocking=False):
+            return
+        try:
+            if self.conn is None or time.monotonic() - self.last_used < KEEPALIVE_INTERVAL:
+                return
+            try:
+                self.conn.get_prompt()
+                self.last_used = time.monotonic()
+            except Exception as e:
+                logger.error(f"Keepalive failed for {self.device['hostname']}: {str(e)}")
+                self.reset()
+        finally:
+            self.lock.release()
+
+    def reset(self):
+        """Closes the session, errors while closing a dead session are ignored."""
+        try:
+            close_connection(self.conn)
+        except Exception:
+            pass
+        self.conn = None
+
+    def close(self):
+        """Closes the session."""
+        with self.lock:
+            self.reset()
+
+def poll(session, command):
+    """Executes one command and saves the output in today's snapshot directory."""
+    hostname = session.device["hostname"]
+    try:
+        with timed_phase(logger, "command", device=hostname, command=command):
+            response = session.send_command(command)
+        output_directory = f"output_{datetime.now().strftime('%Y-%m-%d')}/{hostname}_output"
+        os.makedirs(output_directory, exist_ok=True)
+        if response.failed:
+            write_output(output_filename(output_directory, command), f"Error executing command: {response.result}")
+        else:
+            write_output(output_filename(output_directory, command), response.result)
+    except Exception as e:
+        logger.error(f"Error occurred while polling {command} on {hostname}: {str(e)}")
+
+class Scheduler:
+    """Runs (device, command) jobs from a priority queue ordered on due time and interval."""
+
+    def __init__(self, devices, schedule, concurrency=MAX_CONCURRENCY):
+        self.sessions = [Session(device) for device in devices]
+        self.queue = []
+        self.counter = 0
+        self.slots = threading.Semaphore(concurrency)
+        self.pending_lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=concurrency)
+        now = time.monotonic()
+        for session in self.sessions:
+            for command, interval in schedule:
+                self.push(now, interval, session, command)
+
+    def push(self, due, interval, session, command):
+        """Adds a job, jobs that are due at the same time run the shortest interval first."""
+        self.counter += 1
+        heapq.heappush(self.queue, (due, interval, self.counter, session, command))
+
+    def next_command(self, session):
+        """Returns the next pending command of a device, or marks the device as idle and returns None."""
+        with self.pending_lock:
+            command = session.pending.pop(0) if session.pending else None
+            if command is None:
+                session.busy = False
+            return command
+
+    def run_jobs(self, session, command):
+        """Runs a command and then the commands that became due for the same device in the meantime."""
+        try:
+            while command is not None:
+                poll(session, command)
+                command = self.next_command(session)
+        finally:
+            self.slots.release()
+
+    def run_keepalive(self, session):
+        """Checks an idle session in a worker thread, then runs the commands that became due in the meantime."""
+        try:
+            session.keepalive()
+        finally:
+            self.run_jobs(session, self.next_command(session))
+
+    def submit_keepalives(self, now):
+        """Submits the keepalives of the idle sessions, each holding a slot, returns False when the slots ran out."""
+        for session in self.sessions:
+            if session.conn is None or now - session.last_used < KEEPALIVE_INTERVAL:
+                continue
+            with self.pending_lock:
+                if session.busy:
+                    continue
+                if not self.slots.acquire(blocking=False):
+                    return False
+                # Commands that become due during the keepalive are queued for the session
+                session.busy = True
+            self.executor.submit(self.run_keepalive, session)
+        return True
+
+    def run(self):
+        """Runs the jobs until interrupted."""
+        next_keepalive = time.monotonic() + KEEPALIVE_INTERVAL
+        try:
+            while self.queue:
+                now = time.monotonic()
+                if now >= next_keepalive:
+                    # The keepalives run on the executor, the dispatch never waits for a device;
+                    # when the slots ran out the remaining sessions are checked a second later
+                    next_keepalive = now + (KEEPALIVE_INTERVAL if self.submit_keepalives(now) else 1)
+
+                due, interval, _, session, command = self.queue[0]
+                if due > now:
+                    time.sleep(min(due - now, max(next_keepalive - now, 0), 1))
+                    continue
+
+                with self.pending_lock:
+                    # A busy device gets the command queued, it does not take a slot of another device
+                    queued = session.busy
+                    if queued and command not in session.pending:
+                        session.pending.append(command)
+                if not queued:
+                    # Wait for a free slot before the job leaves the queue
+                    if not self.slots.acquire(timeout=1):
+                        continue
+                    session.busy = True
+                    self.executor.submit(self.run_jobs, session, command)
+                heapq.heappop(self.queue)
+
+                # Keep the schedule fixed, unless the job is more than a whole interval late
+                next_due = due + interval
+                self.push(next_due if next_due > now else now + interval, interval, session, command)
+        except KeyboardInterrupt:
+            print("Stopping poller.")
+        finally:
+            self.executor.shutdown(wait=True)
+            for session in self.sessions:
+                session.close()
+
+def main(argv=None):
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Poll the devices with a per-command interval.")
+    parser.add_argument("--hosts", default=csv_file, help="CSV file with the device details")
+    parser.add_argument("--commands", default=commands_csv_file, help="CSV file with the commands and intervals")
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY, help="maximum number of commands running at the same time")
+    parser.add_argument("--transport", choices=SYNC_TRANSPORTS, help="SSH transport of this run, overrides SSH_TRANSPORT")
+    args = parser.parse_args(argv)
+    setup_logging()
+
+    if args.transport:
+        set_transport(args.transport)
+
+    # Check if all required environment variables are set
+    if not check_environment():
+        exit(1)
+
+    devices = load_devices(args.hosts)
+    schedule = load_schedule(args.commands)
+    Scheduler(devices, schedule, args.concurrency).run()
+
+if __name__ == "__main__":
+    main()
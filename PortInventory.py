@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+
+# created by Alexander Deca - Deca Consulting 06/07/2023
+# please note there is a requirements file -> pip install -r requirements.txt
+# this script builds a port capacity view of the fleet from the saved
+# show interface status and show etherchannel summary outputs.
+# Every port is one row of numpy arrays (switch, model, VLAN, state, trunk, channel),
+# so the used, free and err-disabled ports per switch, per model and per VLAN are
+# computed with vectorised group-bys instead of Python loops over 100k+ ports.
+# The model of a switch is read from its saved show version output. numpy is imported on first use.
+# csv output files : PortsPerSwitch.csv, PortsPerModel.csv, PortsPerVlan.csv
+# usage : python PortInventory.py --directory output_2023-10-29 --prefix Ports
+
+import os
+import re
+import csv
+import logging
+import argparse
+from Locate import normalize_interface, host_from_directory
+
+logging.basicConfig(filename='error.log', level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Specify the directory path containing the subdirectories with show command output
+directory_path = "output"
+
+# Prefix of the output CSV files, followed by PerSwitch.csv, PerModel.csv and PerVlan.csv
+output_prefix = "Ports"
+
+# Port state -> status values of show interface status (IOS/IOS-XE and NX-OS)
+STATES = {
+    "used": ["connected", "monitoring", "up"],
+    "free": ["notconnect", "notconnec", "sfpAbsent", "xcvrAbsen", "xcvrAbsent", "inactive", "noOperMem", "down"],
+    "disabled": ["disabled", "suspended", "suspnd"],
+    "err_disabled": ["err-disabled", "err-disabl", "errDisabled"],
+}
+STATE_NAMES = list(STATES)
+STATE_CODES = {status: code for code, state in enumerate(STATE_NAMES) for status in STATES[state]}
+
+# VLAN column values that are not an access VLAN
+TRUNK = -1
+ROUTED = -2
+
+# Logical and management interfaces are not counted as ports
+LOGICAL_PREFIXES = ("po", "vl", "lo", "tu", "nv", "mgmt")
+
+STATUS_HEADER_RE = re.compile(r"^Port\s+Name\s+Status\s+Vlan\s+Duplex\s+Speed\s+Type.*$", re.M)
+CHANNEL_ROW_RE = re.compile(r"^[ \t]*(?:\d+[ \t]+)?(Po\d+)\(\w+\)[ \t]+\S+[ \t]*(.*)$|^[ \t]+((?:\S+\(\w+\)[ \t]*)+)$", re.M)
+MEMBER_RE = re.compile(r"(\S+)\(\w+\)")
+MODEL_RE = re.compile(r"^\s*cisco (?:Nexus\d+ )?(\S+)(?: \([^)]*\))? (?:processor|[Cc]hassis)", re.M)
+
+PER_SWITCH_FIELDS = ["host", "model", "ports"] + STATE_NAMES + ["trunk", "channel"]
+PER_MODEL_FIELDS = ["model", "switches", "ports"] + STATE_NAMES + ["trunk", "channel"]
+PER_VLAN_FIELDS = ["vlan", "switches", "ports"] + STATE_NAMES
+
+def parse_interface_status(output):
+    """Returns the (port, status, vlan) rows of a show interface status output."""
+    header = STATUS_HEADER_RE.search(output)
+    if not header:
+        return []
+    # The description can contain spaces, so the status and VLAN are read from the Status column on
+    status_column = header.group(0).index("Status")
+    rows = []
+    unknown = 0
+    for line in output[header.end():].splitlines():
+        fields = line[status_column:].split()
+        if len(fields) < 2 or not line[:1].strip() or line.startswith("-"):
+            continue
+        if fields[0] not in STATE_CODES:
+            unknown += 1
+            continue
+        rows.append((line.split()[0], fields[0], fields[1]))
+    if unknown:
+        logger.error(f"Skipped {unknown} ports with an unknown status")
+    return rows
+
+def parse_etherchannel(output):
+    """Returns the set of member ports of the port-channels of a show etherchannel summary output."""
+    members = set()
+    for match in CHANNEL_ROW_RE.finditer(output):
+        # A port-channel without member ports has an empty group 2, a continuation row only has group 3
+        ports = match.group(2) if match.group(1) else match.group(3)
+        members.update(normalize_interface(member) for member in MEMBER_RE.findall(ports))
+    return members
+
+def vlan_code(vlan):
+    """Returns the access VLAN as a number, or TRUNK or ROUTED."""
+    if vlan.isdigit():
+        return int(vlan)
+    return TRUNK if vlan == "trunk" else ROUTED
+
+def read_output(root, prefix):
+    """Returns the content of the first saved output in root that starts with prefix, or an empty string."""
+    for file in sorted(os.listdir(root)):
+        if file.startswith(prefix) and file.endswith(".txt"):
+            with open(os.path.join(root, file), "r") as f:
+                return f.read()
+    return ""
+
+def load_ports(directory):
+    """Parses the saved outputs and returns the host and model names and the port columns as numpy arrays."""
+    import numpy as np
+    hosts, models = [], []
+    model_index = {}
+    host_column, state_column, vlan_column, channel_column = [], [], [], []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        if not any(file.startswith("show_interface_status") for file in files):
+            continue
+        host = host_from_directory(root)
+        try:
+            rows = parse_interface_status(read_output(root, "show_interface_status"))
+            members = parse_etherchannel(read_output(root, "show_etherchannel_summary"))
+            model = MODEL_RE.search(read_output(root, "show_version"))
+        except Exception as e:
+            logger.error(f"Failed to parse the ports of {host}: {e}")
+            continue
+        model = model.group(1) if model else "unknown"
+        host_number = len(hosts)
+        hosts.append(host)
+        models.append(model_index.setdefault(model, len(model_index)))
+        for port, status, vlan in rows:
+            port = normalize_interface(port)
+            if port.startswith(LOGICAL_PREFIXES):
+                continue
+            host_column.append(host_number)
+            state_column.append(STATE_CODES[status])
+            vlan_column.append(vlan_code(vlan))
+            channel_column.append(port in members)
+
+    host_ids = np.array(host_column, dtype=np.int32)
+    columns = {
+        "host": host_ids,
+        "model": np.array(models, dtype=np.int32)[host_ids] if hosts else np.zeros(0, dtype=np.int32),
+        "state": np.array(state_column, dtype=np.int8),
+        "vlan": np.array(vlan_column, dtype=np.int16),
+        "channel": np.array(channel_column, dtype=bool),
+    }
+    return hosts, list(model_index), np.array(models, dtype=np.int32), columns
+
+def count_by(keys, size, columns):
+    """Returns the number of ports, of ports per state, of trunks and of channel members per key, size keys."""
+    import numpy as np
+    counts = {"ports": np.bincount(keys, minlength=size)}
+    for code, state in enumerate(STATE_NAMES):
+        counts[state] = np.bincount(keys, weights=columns["state"] == code, minlength=size).astype(np.int64)
+    counts["trunk"] = np.bincount(keys, weights=columns["vlan"] == TRUNK, minlength=size).astype(np.int64)
+    counts["channel"] = np.bincount(keys, weights=columns["channel"], minlength=size).astype(np.int64)
+    return counts
+
+def aggregate(hosts, model_names, host_models, columns):
+    """Returns the rows of the per switch, per model and per VLAN reports."""
+    import numpy as np
+    per_host = count_by(columns["host"], len(hosts), columns)
+    per_switch = [
+        {"host": host, "model": model_names[host_models[i]], **{field: int(per_host[field][i]) for field in per_host}}
+        for i, host in enumerate(hosts)
+    ]
+
+    per_model_counts = count_by(columns["model"], len(model_names), columns)
+    switches = np.bincount(host_models, minlength=len(model_names))
+    per_model = [
+        {"model": model, "switches": int(switches[i]), **{field: int(per_model_counts[field][i]) for field in per_model_counts}}
+        for i, model in enumerate(model_names)
+    ]
+
+    # Only access ports have a VLAN, the VLANs are renumbered to 0..n for the group-by
+    access = columns["vlan"] >= 0
+    vlans, vlan_keys = np.unique(columns["vlan"][access], return_inverse=True)
+    access_columns = {name: column[access] for name, column in columns.items()}
+    per_vlan_counts = count_by(vlan_keys, len(vlans), access_columns)
+    # A switch is counted once per VLAN, by taking the unique (VLAN, host) pairs
+    pairs = np.unique(vlan_keys.astype(np.int64) * max(len(hosts), 1) + access_columns["host"])
+    vlan_switches = np.bincount(pairs // max(len(hosts), 1), minlength=len(vlans))
+    per_vlan = [
+        {"vlan": int(vlan), "switches": int(vlan_switches[i]), "ports": int(per_vlan_counts["ports"][i]),
+         **{state: int(per_vlan_counts[state][i]) for state in STATE_NAMES}}
+        for i, vlan in enumerate(vlans)
+    ]
+    return per_switch, per_model, per_vlan
+
+def write_report(rows, fields, output_file):
+    """Writes one report."""
+    with open(output_file, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(rows)
+
+def main(argv=None):
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Count the used, free and err-disabled ports per switch, model and VLAN.")
+    parser.add_argument("--directory", default=directory_path, help="directory with the show command outputs")
+    parser.add_argument("--prefix", default=output_prefix, help="prefix of the output CSV files")
+    args = parser.parse_args(argv)
+
+    try:
+        hosts, model_names, host_models, columns = load_ports(args.directory)
+        per_switch, per_model, per_vlan = aggregate(hosts, model_names, host_models, columns)
+    except Exception as e:
+        logger.error(f"Failed to build the port inventory of {args.directory}: {e}")
+        return
+
+    write_report(per_switch, PER_SWITCH_FIELDS, f"{args.prefix}PerSwitch.csv")
+    write_report(per_model, PER_MODEL_FIELDS, f"{args.prefix}PerModel.csv")
+    write_report(per_vlan, PER_VLAN_FIELDS, f"{args.prefix}PerVlan.csv")
+
+    totals = {state: int((columns["state"] == code).sum()) for code, state in enumerate(STATE_NAMES)}
+    print(f"{len(columns['state'])} ports on {len(hosts)} switches: " + ", ".join(f"{count} {state}" for state, count in totals.items()))
+
+if __name__ == "__main__":
+    main()
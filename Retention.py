@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+
+# created by Alexander Deca - Deca Consulting 06/07/2023
+# please note there is a requirements file -> pip install -r requirements.txt
+# this script prunes the old output_{date} snapshots with a retention policy:
+# every snapshot of the last DAILY_DAYS days is kept, and the last snapshot of every
+# week of the last WEEKLY_WEEKS weeks. Running configs that changed compared to the
+# previous snapshot are kept forever, the rest of an expired snapshot is deleted.
+# The files to delete are taken from the manifest.csv of the snapshots instead of
+# walking the tree, they are deleted in parallel and the manifests are updated.
+# With --diffs the diff files listed in the index.csv of RunDiff.py are deleted too.
+# usage : python Retention.py --daily 14 --weekly 8 [--diffs diff] [--dry-run]
+
+import os
+import csv
+import logging
+import argparse
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from Manifest import SNAPSHOT_MANIFEST, find_snapshots, load_manifest, save_manifest, write_snapshot_manifest
+
+logging.basicConfig(filename='error.log', level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Specify the directory containing the output_{date} snapshots
+directory_path = "."
+
+# Keep every snapshot of the last days, and the last snapshot of every week of the last weeks
+DAILY_DAYS = 14
+WEEKLY_WEEKS = 8
+
+# Saved running configs, kept forever when they changed
+CONFIG_FILES = ["show_running-config.txt"]
+
+# Number of threads deleting files
+DELETE_WORKERS = 16
+
+def retention_policy(dates, today, daily_days=DAILY_DAYS, weekly_weeks=WEEKLY_WEEKS):
+    """Returns the reason to keep every date, daily, weekly or None when the snapshot expired."""
+    reasons = {}
+    weeks = {}
+    for snapshot_date in sorted(dates):
+        if snapshot_date > today - timedelta(days=daily_days):
+            reasons[snapshot_date] = "daily"
+        else:
+            reasons[snapshot_date] = None
+            if snapshot_date > today - timedelta(weeks=weekly_weeks):
+                # The last snapshot of the week wins, as the dates are sorted
+                weeks[snapshot_date.isocalendar()[:2]] = snapshot_date
+    for snapshot_date in weeks.values():
+        reasons[snapshot_date] = "weekly"
+    return reasons
+
+def changed_configs(manifests):
+    """Returns the set of (snapshot, path) of the running configs that differ from the previous config of the host.
+
+    manifests is a list of (snapshot, manifest) oldest first, the first config of a host counts as changed.
+    """
+    previous = {}
+    changed = set()
+    for snapshot, manifest in manifests:
+        for path, row in manifest.items():
+            if os.path.basename(path) not in CONFIG_FILES:
+                continue
+            if previous.get(path) != row["sha256"]:
+                changed.add((snapshot, path))
+            previous[path] = row["sha256"]
+    return changed
+
+def reclaimed_bytes(file_paths):
+    """Returns the space freed by deleting the files, a hard linked file only counts when all its links are deleted."""
+    def file_stat(file_path):
+        try:
+            return os.stat(file_path)
+        except OSError:
+            return None
+
+    inodes = {}
+    with ThreadPoolExecutor(max_workers=DELETE_WORKERS) as executor:
+        for stat in executor.map(file_stat, file_paths):
+            if stat is not None:
+                links, size, count = inodes.get((stat.st_dev, stat.st_ino), (stat.st_nlink, stat.st_size, 0))
+                inodes[(stat.st_dev, stat.st_ino)] = (links, size, count + 1)
+    return sum(size for links, size, count in inodes.values() if count >= links)
+
+def plan_retention(directory, today, daily_days=DAILY_DAYS, weekly_weeks=WEEKLY_WEEKS, index_missing=False):
+    """Returns the plan per snapshot: date, reason, manifest, the paths to delete and the paths kept."""
+    manifests = []
+    for snapshot_date, snapshot in find_snapshots(directory):
+        manifest = load_manifest(os.path.join(snapshot, SNAPSHOT_MANIFEST))
+        if not manifest and index_missing:
+            manifest = write_snapshot_manifest(snapshot)
+        manifests.append((snapshot_date, snapshot, manifest))
+
+    reasons = retention_policy([snapshot_date for snapshot_date, _, _ in manifests], today, daily_days, weekly_weeks)
+    changed = changed_configs([(snapshot, manifest) for _, snapshot, manifest in manifests])
+
+    plan = []
+    for snapshot_date, snapshot, manifest in manifests:
+        entry = {"date": snapshot_date, "snapshot": snapshot, "reason": reasons[snapshot_date], "manifest": manifest,
+                 "delete": [], "keep": []}
+        if entry["reason"] is None:
+            if not manifest:
+                entry["reason"] = "no manifest"
+            else:
+                for path in sorted(manifest):
+                    entry["keep" if (snapshot, path) in changed else "delete"].append(path)
+        plan.append(entry)
+    return plan
+
+def remove_file(file_path):
+    """Deletes a file, returns the error message or None."""
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        return None
+    except OSError as e:
+        return str(e)
+    return None
+
+def delete_files(file_paths):
+    """Deletes the files in parallel, returns the number of files that could not be deleted."""
+    errors = 0
+    with ThreadPoolExecutor(max_workers=DELETE_WORKERS) as executor:
+        for file_path, error in zip(file_paths, executor.map(remove_file, file_paths, chunksize=64)):
+            if error:
+                errors += 1
+                logger.error(f"Failed to delete {file_path}: {error}")
+    return errors
+
+def apply_retention(plan):
+    """Deletes the expired files, updates the manifests and removes the empty directories."""
+    expired = [entry for entry in plan if entry["delete"]]
+    errors = delete_files([os.path.join(entry["snapshot"], path) for entry in expired for path in entry["delete"]])
+
+    for entry in expired:
+        snapshot = entry["snapshot"]
+        # Deepest directories first, a directory that still has files is left
+        directories = {os.path.dirname(path) for path in entry["delete"]} - {""}
+        for directory in sorted(directories, key=lambda path: path.count(os.sep), reverse=True):
+            try:
+                os.rmdir(os.path.join(snapshot, directory))
+            except OSError:
+                pass
+        manifest_file = os.path.join(snapshot, SNAPSHOT_MANIFEST)
+        if entry["keep"]:
+            save_manifest({path: entry["manifest"][path] for path in entry["keep"]}, manifest_file)
+        else:
+            os.remove(manifest_file)
+            try:
+                os.rmdir(snapshot)
+            except OSError as e:
+                logger.error(f"Snapshot {snapshot} is not empty after the retention: {e}")
+    return errors
+
+def diff_files(diff_directory):
+    """Returns the diff files listed in the index.csv of RunDiff.py and the index itself."""
+    index_path = os.path.join(diff_directory, "index.csv")
+    if not os.path.exists(index_path):
+        return []
+    with open(index_path, "r", newline="") as file:
+        return [row["diff_file"] for row in csv.DictReader(file) if row["diff_file"]] + [index_path]
+
+def print_report(plan, diffs, reclaimed, dry_run):
+    """Prints the snapshots that are kept and the files that are deleted per expired snapshot."""
+    print(f"{'snapshot':<30} {'policy':<12} {'files':>8} {'delete':>8} {'keep':>6}")
+    for entry in plan:
+        reason = entry["reason"] or "expired"
+        print(f"{os.path.basename(entry['snapshot']):<30} {reason:<12} {len(entry['manifest']):>8} "
+              f"{len(entry['delete']):>8} {len(entry['keep']):>6}")
+    files = sum(len(entry["delete"]) for entry in plan) + len(diffs)
+    verb = "Would delete" if dry_run else "Deleted"
+    print(f"{verb} {files} files, {reclaimed / 1024 / 1024:.1f} MB reclaimed.")
+
+def main(argv=None):
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Prune the old snapshots, keeping the changed running configs.")
+    parser.add_argument("--directory", default=directory_path, help="directory with the output_{date} snapshots")
+    parser.add_argument("--daily", type=int, default=DAILY_DAYS, help="keep every snapshot of this many days")
+    parser.add_argument("--weekly", type=int, default=WEEKLY_WEEKS, help="keep the last snapshot of the week for this many weeks")
+    parser.add_argument("--diffs", help="also delete the diff files of this RunDiff.py diff directory")
+    parser.add_argument("--index-missing", action="store_true", help="write the manifest of the snapshots without one first")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be deleted")
+    args = parser.parse_args(argv)
+
+    plan = plan_retention(args.directory, date.today(), args.daily, args.weekly, args.index_missing)
+    diffs = diff_files(args.diffs) if args.diffs else []
+    file_paths = [os.path.join(entry["snapshot"], path) for entry in plan for path in entry["delete"]] + diffs
+    reclaimed = reclaimed_bytes(file_paths)
+
+    for entry in plan:
+        if entry["reason"] == "no manifest":
+            logger.error(f"Snapshot {entry['snapshot']} expired but has no manifest, run with --index-missing")
+
+    if not args.dry_run:
+        errors = apply_retention(plan) + delete_files(diffs)
+        if errors:
+            print(f"{errors} files could not be deleted, see error.log.")
+    print_report(plan, diffs, reclaimed, args.dry_run)
+
+if __name__ == "__main__":
+    main()
@@ -3,19 +3,49 @@
 # created by Alexander Deca - Deca Consulting 06/07/2023
 # please note there is a requirements file -> pip install -r requirements.txt
 # this script iterates over 2 directories and runs a diff between the files
-# within that directory
+# within that directory. Identical files are skipped based on size and hash,
+# the diffs of the changed files run in parallel and a summary of the changed
+# hosts and commands is written to index.csv in the diff directory.
+# usage : python RunDiff.py --mode config output_dir1 output_dir2
+# the config mode ignores volatile lines and diffs running configs per stanza
 
 import os
+import csv
 import difflib
+import hashlib
 import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import ConfigDiff
+from Manifest import SNAPSHOT_MANIFEST
 
 # Set up logging
 
 logging.basicConfig(filename='error.log', level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def perform_diff(file1_path, file2_path, diff_directory):
-    """Performs diff between two files and saves the differences"""
+# Number of worker processes for the diffs, None uses the number of CPUs
+MAX_WORKERS = None
+
+# Diff mode, "line" for a plain difflib diff or "config" for the config aware diff
+DIFF_MODE = "line"
+
+def file_digest(file_path):
+    """Returns the sha256 hash of a file"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def files_identical(file1_path, file2_path):
+    """Returns True when both files have the same size and hash"""
+    if os.path.getsize(file1_path) != os.path.getsize(file2_path):
+        return False
+    return file_digest(file1_path) == file_digest(file2_path)
+
+def perform_diff(file1_path, file2_path, diff_directory, mode=DIFF_MODE):
+    """Performs diff between two files and saves the differences, returns the # of added and removed lines"""
     try:
         with open(file1_path, 'r') as file1:
             file1_content = file1.readlines()
@@ -24,47 +54,103 @@ def perform_diff(file1_path, file2_path, diff_directory):
             file2_content = file2.readlines()
 
         # Perform the diff
-        diff = difflib.unified_diff(file1_content, file2_content, fromfile=file1_path, tofile=file2_path)
+        if mode == "config":
+            command = os.path.basename(file1_path)
+            diff = list(ConfigDiff.config_diff(file1_content, file2_content, command, fromfile=file1_path, tofile=file2_path))
+            if not diff:
+                # Only volatile lines changed
+                return None
+        else:
+            diff = difflib.unified_diff(file1_content, file2_content, fromfile=file1_path, tofile=file2_path)
 
         # Create the diff directory if it doesn't exist
         os.makedirs(diff_directory, exist_ok=True)
 
         # Output the differences to a file within the diff directory
+        added = removed = 0
         diff_file_path = os.path.join(diff_directory, os.path.basename(file1_path) + "_diff.txt")
         with open(diff_file_path, "w") as output_file:
             output_file.write(f"Differences between {file1_path} and {file2_path}:\n")
             for line in diff:
+                if line.startswith('+') and not line.startswith('+++'):
+                    added += 1
+                elif line.startswith('-') and not line.startswith('---'):
+                    removed += 1
                 output_file.write(line)
+        return diff_file_path, added, removed
     except Exception as e:
         logger.error(f"Error occurred while processing files: {str(e)}")
+        return None
 
-def compare_directories(directory1, directory2, parent_diff_directory):
-    """Compares files in two directories"""
+def collect_pairs(directory1, directory2, parent_diff_directory, pairs):
+    """Collects the file pairs present in both directories"""
     try:
         files1 = os.listdir(directory1)
         files2 = os.listdir(directory2)
     except Exception as e:
         logger.error(f"Error occurred while accessing directories: {str(e)}")
-        return
+        return pairs
 
     # Create the diff directory for the current directories
     diff_directory = os.path.join(parent_diff_directory, os.path.basename(directory1) + "_diff")
 
     for file in files1:
+        # The snapshot manifest changes on every run
+        if file.startswith(SNAPSHOT_MANIFEST):
+            continue
         file1_path = os.path.join(directory1, file)
         file2_path = os.path.join(directory2, file)
 
         if os.path.isdir(file1_path) and os.path.isdir(file2_path):
-            compare_directories(file1_path, file2_path, diff_directory)
+            collect_pairs(file1_path, file2_path, diff_directory, pairs)
         elif os.path.isfile(file1_path) and os.path.isfile(file2_path):
-            perform_diff(file1_path, file2_path, diff_directory)
+            pairs.append((file1_path, file2_path, diff_directory))
         else:
             logger.error(f"File '{file}' is not present in both directories or is of different types.")
 
     for file in files2:
-        if file not in files1:
+        if file not in files1 and not file.startswith(SNAPSHOT_MANIFEST):
             logger.error(f"File '{file}' is only present in directory 2.")
 
+    return pairs
+
+def write_index(changes, parent_diff_directory):
+    """Writes the summary of the changed hosts and commands"""
+    os.makedirs(parent_diff_directory, exist_ok=True)
+    index_path = os.path.join(parent_diff_directory, "index.csv")
+    with open(index_path, "w", newline="") as index_file:
+        writer = csv.writer(index_file)
+        writer.writerow(["host", "command", "added", "removed", "diff_file"])
+        for file1_path, diff_file_path, added, removed in sorted(changes):
+            host = os.path.basename(os.path.dirname(file1_path)).split("_")[0]
+            command = os.path.splitext(os.path.basename(file1_path))[0]
+            writer.writerow([host, command, added, removed, diff_file_path])
+    return index_path
+
+def compare_directories(directory1, directory2, parent_diff_directory, mode=DIFF_MODE):
+    """Compares files in two directories, only the changed files are diffed"""
+    pairs = collect_pairs(directory1, directory2, parent_diff_directory, [])
+
+    changed = []
+    for file1_path, file2_path, diff_directory in pairs:
+        try:
+            if not files_identical(file1_path, file2_path):
+                changed.append((file1_path, file2_path, diff_directory))
+        except Exception as e:
+            logger.error(f"Error occurred while comparing {file1_path} and {file2_path}: {str(e)}")
+
+    changes = []
+    if changed:
+        with ProcessPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            results = executor.map(perform_diff, *zip(*changed), [mode] * len(changed))
+            for (file1_path, file2_path, diff_directory), result in zip(changed, results):
+                if result is not None:
+                    changes.append((file1_path,) + result)
+
+    write_index(changes, parent_diff_directory)
+    print(f"{len(pairs)} files compared, {len(pairs) - len(changed)} identical, {len(changes)} diffs written.")
+    return changes
+
 # Main directories to compare
 main_directory1 = 'output_dir1'
 main_directory2 = 'output_dir2'
@@ -72,4 +158,16 @@ main_directory2 = 'output_dir2'
 # Directory to store the diff files
 parent_diff_directory = 'diff'
 
-compare_directories(main_directory1, main_directory2, parent_diff_directory)
\ No newline at end of file
+def main(argv=None):
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Diff the files of two output directories.")
+    parser.add_argument("directory1", nargs="?", default=main_directory1)
+    parser.add_argument("directory2", nargs="?", default=main_directory2)
+    parser.add_argument("--diff-directory", default=parent_diff_directory)
+    parser.add_argument("--mode", choices=["line", "config"], default=DIFF_MODE)
+    args = parser.parse_args(argv)
+
+    compare_directories(args.directory1, args.directory2, args.diff_directory, mode=args.mode)
+
+if __name__ == "__main__":
+    main()
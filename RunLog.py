@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+
+# created by Alexander Deca - Deca Consulting 06/07/2023
+# please note there is a requirements file -> pip install -r requirements.txt
+# this module contains the logging backend shared by the scripts.
+# The worker threads only put the records on a queue (QueueHandler), one listener
+# thread writes them (QueueListener), so logging never blocks the collection.
+# Every record is written as one JSON line in run_log.jsonl, rotated at LOG_MAX_BYTES,
+# with the device, command, phase and duration fields when they are given.
+# Errors are also written to error.log in the usual text format.
+# The run summary is built from the JSON records of the run.
+# usage : python RunLog.py [--run RUN_ID] [--log run_log.jsonl]
+
+import os
+import json
+import time
+import queue
+import atexit
+import logging
+import argparse
+import contextlib
+import logging.handlers
+from datetime import datetime
+
+LOG_FILE = "run_log.jsonl"
+ERROR_LOG_FILE = "error.log"
+LOG_MAX_BYTES = 10 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+ERROR_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+# Structured fields of a record, given with extra={...}
+EVENT_FIELDS = ["device", "command", "phase", "duration", "status"]
+
+# Status of a device event that counts as failed in the summary
+FAILED_STATUSES = ["error", "failed"]
+
+# Identifies the records of this run in the log file
+RUN_ID = f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+
+listener = None
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON line."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "run": RUN_ID,
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in EVENT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        return json.dumps(entry)
+
+class EventFilter(logging.Filter):
+    """Keeps the events of the scripts and the warnings, drops the chatter of the libraries."""
+
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or getattr(record, "phase", None) is not None
+
+def setup_logging(log_file=LOG_FILE, error_file=ERROR_LOG_FILE):
+    """Replaces the handlers of the root logger by a queue, written by a listener thread."""
+    global listener
+    if listener is not None:
+        return listener
+
+    json_handler = logging.handlers.RotatingFileHandler(log_file, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
+    json_handler.setFormatter(JsonFormatter())
+    json_handler.addFilter(EventFilter())
+    error_handler = logging.FileHandler(error_file)
+    error_handler.setFormatter(logging.Formatter(ERROR_FORMAT))
+    error_handler.setLevel(logging.ERROR)
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    log_queue = queue.SimpleQueue()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(logging.INFO)
+
+    listener = logging.handlers.QueueListener(log_queue, json_handler, error_handler, respect_handler_level=True)
+    listener.start()
+    atexit.register(stop_logging)
+    return listener
+
+def stop_logging():
+    """Writes the records still in the queue and stops the listener."""
+    global listener
+    if listener is not None:
+        listener.stop()
+        for handler in listener.handlers:
+            handler.close()
+        listener = None
+
+def flush_logging():
+    """Waits until the records in the queue are written, returns False when the queue logging is not set up."""
+    if listener is None:
+        return False
+    listener.stop()
+    listener.start()
+    return True
+
+def log_event(logger, phase, message="", level=logging.INFO, **fields):
+    """Logs a structured event, fields are device, command, duration and status."""
+    logger.log(level, message or phase, extra={"phase": phase, **fields})
+
+@contextlib.contextmanager
+def timed_phase(logger, phase, **fields):
+    """Logs the duration of a phase, with status error when it raised an exception."""
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except Exception:
+        status = "error"
+        raise
+    finally:
+        log_event(logger, phase, duration=round(time.perf_counter() - start, 3), status=status, **fields)
+
+def read_records(log_file=LOG_FILE, run=None):
+    """Reads the JSON records of the log file and its rotated files, oldest first, of one run when given."""
+    files = [f"{log_file}.{index}" for index in range(LOG_BACKUP_COUNT, 0, -1)] + [log_file]
+    records = []
+    for file_path in files:
+        if not os.path.exists(file_path):
+            continue
+        with open(file_path, "r") as file:
+            for line in file:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if run is None or record.get("run") == run:
+                    records.append(record)
+    return records
+
+def summarize(records):
+    """Returns the number of events, the total and maximum duration per phase, the errors and the slowest devices."""
+    phases = {}
+    devices = {}
+    failed = set()
+    errors = 0
+    for record in records:
+        if record["level"] in ("ERROR", "CRITICAL"):
+            errors += 1
+        phase = record.get("phase")
+        if phase == "device" and record.get("status") in FAILED_STATUSES:
+            failed.add(record.get("device"))
+        if phase is None or "duration" not in record:
+            continue
+        stats = phases.setdefault(phase, {"count": 0, "total": 0.0, "max": 0.0})
+        stats["count"] += 1
+        stats["total"] += record["duration"]
+        stats["max"] = max(stats["max"], record["duration"])
+        if phase == "device" and record.get("device"):
+            devices[record["device"]] = record["duration"]
+    slowest = sorted(devices.items(), key=lambda item: item[1], reverse=True)[:5]
+    return {"phases": phases, "errors": errors, "failed": sorted(failed), "slowest": slowest}
+
+def print_summary(summary):
+    """Prints a run summary."""
+    print(f"{'phase':<16} {'count':>7} {'total s':>10} {'mean s':>8} {'max s':>8}")
+    for phase, stats in sorted(summary["phases"].items()):
+        print(f"{phase:<16} {stats['count']:>7} {stats['total']:>10.2f} {stats['total'] / stats['count']:>8.2f} {stats['max']:>8.2f}")
+    if summary["slowest"]:
+        print("Slowest devices: " + ", ".join(f"{device} ({duration:.1f}s)" for device, duration in summary["slowest"]))
+    if summary["failed"]:
+        print(f"Failed devices: {', '.join(summary['failed'])}")
+    print(f"{len(summary['failed'])} devices failed, {summary['errors']} errors logged.")
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Show the summary of a run from the JSON log.")
+    parser.add_argument("--log", default=LOG_FILE, help="JSON log file")
+    parser.add_argument("--run", help="run id, the last run when not given")
+    args = parser.parse_args()
+
+    records = read_records(args.log)
+    run = args.run or (records[-1]["run"] if records else None)
+    records = [record for record in records if record.get("run") == run]
+    if not records:
+        print("No records found.")
+        return
+    print(f"Run {run}, {len(records)} records.")
+    print_summary(summarize(records))
+
+if __name__ == "__main__":
+    main()
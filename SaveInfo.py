@@ -5,96 +5,427 @@
 # this script iterates over a # of commands that will be executed on the network
 # device and saves the output to txt file
 # input csv file format is ip_address,name,platform
+# Before show running-config is pulled, a cheap change marker is asked to the
+# device and compared with the previous snapshot. When the configuration did not
+# change, the running config of the previous snapshot is linked instead.
+# The devices are collected by a pool of workers. The duration per device is
+# recorded, and on later runs the devices expected to take longest start first.
+# The logins are rate limited in Connection.py, the time waited is part of run_timings.csv.
+# Every login, command and device is logged as a JSON record in run_log.jsonl (RunLog.py),
+# the summary at the end of the run is built from these records.
+# With --pipeline the show version and show mac address-table outputs are also sent
+# through a bounded queue to parser processes and a report writer while the collection
+# is running, so SaveVersion.csv and MacInfo.csv are ready right after the last device.
+# With --shard i/N only the devices of shard i are collected, in output_{date}_shard{i}of{N},
+# so the collection can be split over several nodes and merged with MergeSnapshots.py.
+# usage : python SaveInfo.py --hosts hosts.csv --commands commands.csv --workers 10 [--shard 1/3] [--pipeline]
 
 import os
+import re
 import csv
+import time
+import queue
+import shutil
 import logging
-import os
-from scrapli.driver.core import IOSXEDriver, NXOSDriver, IOSXRDriver
+import threading
+import multiprocessing
+import argparse
+import statistics
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from Connection import check_environment, parse_shard, load_devices, load_commands, establish_connection, close_connection, login_limiter, set_transport, SYNC_TRANSPORTS
+from Manifest import find_snapshots, write_snapshot_manifest
+from RunLog import RUN_ID, setup_logging, flush_logging, log_event, timed_phase, read_records, summarize, print_summary
 
 now = datetime.now()
 date = now.strftime("%Y-%m-%d")
 
-# Constants
-SSH_PORT = int(os.getenv("SSH_PORT", 22))
-
-# Environment Variables 
-SSH_USER = os.getenv("SSH_USER")
-SSH_PWD = os.getenv("SSH_PWD")
-
 logging.basicConfig(filename='error.log', level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-# Check if all required environment variables are set
-if not all([SSH_USER, SSH_PWD, SSH_PORT]):
-    logger.error("One or more environment variables are not set")
-    exit(1)
-
-# Define the CSV file path containing the device details
+# Define the CSV file paths containing the device details and the commands
 csv_file = 'hosts_brugge.csv'
+commands_csv_file = 'commands_brugge.csv'
+
+# Snapshot directory of this run
+snapshot_directory = f"output_{date}"
+
+# Number of devices collected at the same time
+MAX_WORKERS = 10
+
+# Duration per device of the previous runs, and the wall time per run
+timings_file = 'device_timings.csv'
+run_timings_file = 'run_timings.csv'
+TIMING_FIELDS = ["date", "ip_address", "hostname", "platform", "type", "duration"]
+RUN_TIMING_FIELDS = ["date", "devices", "workers", "wall_time", "device_time", "logins", "login_retries", "login_wait", "login_max_wait"]
+
+# Expected duration in seconds for a device without any timing history
+DEFAULT_DURATION = 60
 
-# Create a list to store the devices
-devices = []
-
-# Read the CSV file and populate the devices list
-with open(csv_file, 'r') as file:
-    reader = csv.DictReader(file)
-    for row in reader:
-        devices.append(row)
-
-# Iterate over the devices
-for device in devices:
-    # Connect to the device using Scrapli
-    driver = None
-    if device["platform"] == "iosxe":
-        driver = IOSXEDriver
-        hostname_line = 0  # Line index for IOS XE
-    elif device["platform"] == "nxos":
-        driver = NXOSDriver
-        hostname_line = 0  # Line index for NX-OS
-    elif device["platform"] == "iosxr":
-        driver = IOSXRDriver
-        hostname_line = 2  # Line index for IOS XR
+# Command that is only executed when the change marker differs from the previous snapshot
+RUNNING_CONFIG_COMMAND = "show running-config"
 
+# Cheap command per platform that changes when the configuration changes, None always pulls the config
+CHANGE_MARKER_COMMANDS = {
+    "iosxe": "show configuration id",
+    "iosxr": "show configuration commit list 1",
+    "nxos": None,
+}
+
+# Part of the change marker output that is compared, per platform. IOS-XR prints a timestamp
+# before every output, so only the commit ID column of the commit list is compared.
+CHANGE_MARKER_PATTERNS = {
+    "iosxr": re.compile(r"^\s*\d+\s+(\d+)\s", re.M),
+}
+
+# Pipeline mode: parser processes, number of outputs queued at most (the collection waits when
+# the parsers fall behind) and the reports, with the same columns as SaveVersion.py and MacLookup.py
+PARSER_WORKERS = 4
+PIPELINE_QUEUE_SIZE = 100
+version_report_file = 'SaveVersion.csv'
+mac_report_file = 'MacInfo.csv'
+VERSION_REPORT_FIELDS = ["hostname", "type", "software version", "software image"]
+MAC_REPORT_FIELDS = ["host", "mac_address", "interface", "mac_type", "vlan", "vendor"]
+
+def output_filename(output_directory, command):
+    """Returns the file name used to save the output of a command."""
+    return f"{output_directory}/{command.replace(' ', '_')}.txt"
+
+def write_output(file_path, text):
+    """Writes a command output, a linked file is removed first so the previous snapshot is not changed."""
+    if os.path.exists(file_path):
+        os.remove(file_path)
+    with open(file_path, 'w') as output_file:
+        output_file.write(text)
+
+def previous_snapshot_file(hostname, filename):
+    """Returns the path of a file in the most recent earlier complete snapshot, or None."""
+    for _, directory in reversed(find_snapshots(".")):
+        if os.path.basename(directory) == snapshot_directory:
+            continue
+        file_path = os.path.join(directory, f"{hostname}_output", filename)
+        if os.path.isfile(file_path):
+            return file_path
+    return None
+
+def link_file(source, destination):
+    """Hard links a file, or copies it when the file system does not support links."""
+    if os.path.exists(destination):
+        if os.path.samefile(source, destination):
+            return
+        os.remove(destination)
     try:
-        conn = driver(
-            host=device["ip_address"],
-            auth_username=SSH_USER,
-            auth_password=SSH_PWD,
-            auth_strict_key=False,
-            ssh_config_file="~/.ssh/config",
-        )
-        conn.open()
-        if conn.isalive():
-            # Get the hostname from the device["name"]
-            hostname = device["hostname"]
-            
-            # Create a directory with the hostname if it doesn't exist
-            output_directory = f"output_{date}/{hostname}_output"
-            if not os.path.exists(output_directory):
-                os.makedirs(output_directory)
-            
-            # Read the commands from the CSV file
-            commands = []
-            with open('commands_brugge.csv', 'r') as commands_file:
-                commands_reader = csv.reader(commands_file)
-                header = next(commands_reader)
-                for command_row in commands_reader:
-                    commands.append(command_row[0])
-          
-            # Execute each command and save the output or error message
-            for command in commands:
-                command_result = conn.send_command(command)
-                output_filename = f"{output_directory}/{command.replace(' ', '_')}.txt"
-                with open(output_filename, 'w') as output_file:
-                    if command_result.failed:
-                        output_file.write(f"Error executing command: {command_result.result}")
-                    else:
-                        output_file.write(command_result.result)
-            
-                logger.info(f"Commands executed successfully for {device['hostname']}. Output saved in {output_directory}.")
+        os.link(source, destination)
+    except OSError:
+        shutil.copy2(source, destination)
+
+def change_marker(platform, output):
+    """Returns the comparable part of a change marker output, or None when it holds no marker."""
+    pattern = CHANGE_MARKER_PATTERNS.get(platform)
+    if pattern is None:
+        return output.strip() or None
+    return " ".join(pattern.findall(output)) or None
+
+def reuse_running_config(conn, device, output_directory):
+    """Links the previous running config when the change marker did not change, returns True when linked."""
+    marker_command = CHANGE_MARKER_COMMANDS.get(device["platform"])
+    if not marker_command:
+        return False
+
+    marker_result = conn.send_command(marker_command)
+    if marker_result.failed:
+        logger.error(f"Change marker not available for {device['hostname']}: {marker_result.result}")
+        return False
+
+    marker_file = output_filename(output_directory, marker_command)
+    write_output(marker_file, marker_result.result)
+
+    config_filename = os.path.basename(output_filename(output_directory, RUNNING_CONFIG_COMMAND))
+    previous_marker = previous_snapshot_file(device["hostname"], os.path.basename(marker_file))
+    previous_config = previous_snapshot_file(device["hostname"], config_filename)
+    if not previous_marker or not previous_config:
+        return False
+    # Both files have to come from the same snapshot
+    if os.path.dirname(previous_marker) != os.path.dirname(previous_config):
+        return False
+
+    marker = change_marker(device["platform"], marker_result.result)
+    with open(previous_marker, 'r') as file:
+        if marker is None or change_marker(device["platform"], file.read()) != marker:
+            return False
+    with open(previous_config, 'r') as file:
+        if file.read(len("Error executing command")) == "Error executing command":
+            return False
+
+    link_file(previous_config, os.path.join(output_directory, config_filename))
+    logger.info(f"Configuration of {device['hostname']} unchanged, linked {previous_config}.")
+    return True
+
+def parse_report(prefix, hostname, output):
+    """Parses one output into report rows in a parser process, returns the rows, the duration and the error."""
+    # The parsers are only imported in pipeline mode
+    import MacLookup
+    import SaveVersion
+    start = time.perf_counter()
+    try:
+        if prefix == "show_version":
+            rows = [list(SaveVersion.parse_cisco_show_output(output))]
         else:
-            logger.error(f"Connection to {device['hostname']} is not alive.")
+            rows = [[hostname] + entry for entry in MacLookup.parse_cisco_show_output(output)]
+        return rows, time.perf_counter() - start, None
     except Exception as e:
-        logger.error(f"Error occurred while establishing connection with {device['ip_address']}: {str(e)}")
\ No newline at end of file
+        return [], time.perf_counter() - start, str(e)
+
+class Pipeline:
+    """Parses the saved outputs in parser processes while the collection is running and writes the reports."""
+
+    def __init__(self, workers=PARSER_WORKERS, queue_size=PIPELINE_QUEUE_SIZE):
+        # Output file name prefix -> report file and columns, the rows come from parse_report
+        self.reports = {
+            "show_version": (version_report_file, VERSION_REPORT_FIELDS),
+            "show_mac": (mac_report_file, MAC_REPORT_FIELDS),
+        }
+        # The report files are opened here, so an error stops the run before the collection starts
+        self.files = {}
+        self.writers = {}
+        for prefix, (report_file, fieldnames) in self.reports.items():
+            self.files[prefix] = open(report_file + '.tmp', 'w', newline='')
+            self.writers[prefix] = csv.writer(self.files[prefix])
+            self.writers[prefix].writerow(fieldnames)
+        # The parsing is CPU bound, so it runs in processes to use more than one CPU. The processes
+        # are spawned, a fork of this process with its worker and logging threads could deadlock.
+        self.executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        # Outputs submitted and not written yet, submit blocks when the parsers fall behind
+        self.slots = threading.Semaphore(queue_size)
+        self.write_queue = queue.Queue()
+        self.writer = threading.Thread(target=self.write, daemon=True)
+        self.writer.start()
+
+    def submit(self, hostname, file_path, output):
+        """Queues an output for parsing when a report uses it, blocks while too many outputs are queued."""
+        file_name = os.path.basename(file_path)
+        for prefix in self.reports:
+            if file_name.startswith(prefix):
+                self.slots.acquire()
+                future = self.executor.submit(parse_report, prefix, hostname, output)
+                self.write_queue.put((prefix, hostname, future))
+
+    def write(self):
+        """Writer thread, writes the parsed rows to the temporary report files until it gets None."""
+        while True:
+            item = self.write_queue.get()
+            if item is None:
+                break
+            prefix, hostname, future = item
+            try:
+                rows, duration, error = future.result()
+                log_event(logger, "parse", device=hostname, command=prefix, duration=round(duration, 3),
+                          status="error" if error else "ok")
+                if error:
+                    logger.error(f"Failed to parse {prefix} of {hostname}: {error}")
+                self.writers[prefix].writerows(rows)
+            except Exception as e:
+                logger.error(f"Failed to write the {prefix} report rows of {hostname}: {e}")
+            finally:
+                self.slots.release()
+
+    def close(self):
+        """Waits for the queued outputs and moves the complete reports in place."""
+        self.write_queue.put(None)
+        self.writer.join()
+        self.executor.shutdown(wait=True)
+        for prefix, (report_file, _) in self.reports.items():
+            self.files[prefix].close()
+            os.replace(report_file + '.tmp', report_file)
+
+def collect_device(device, commands, pipeline=None):
+    """Executes the commands on one device and saves the output, and queues it for parsing in pipeline mode."""
+    conn = establish_connection(device)
+    if not conn:
+        return False
+
+    try:
+        # Get the hostname from the device["name"]
+        hostname = device["hostname"]
+
+        # Create a directory with the hostname if it doesn't exist
+        output_directory = f"{snapshot_directory}/{hostname}_output"
+        if not os.path.exists(output_directory):
+            os.makedirs(output_directory)
+
+        # Execute each command and save the output or error message
+        for command in commands:
+            with timed_phase(logger, "command", device=hostname, command=command):
+                if command == RUNNING_CONFIG_COMMAND and reuse_running_config(conn, device, output_directory):
+                    continue
+                command_result = conn.send_command(command)
+                file_path = output_filename(output_directory, command)
+                if command_result.failed:
+                    write_output(file_path, f"Error executing command: {command_result.result}")
+                else:
+                    write_output(file_path, command_result.result)
+                    if pipeline:
+                        pipeline.submit(hostname, file_path, command_result.result)
+
+        logger.info(f"Commands executed successfully for {device['hostname']}. Output saved in {output_directory}.")
+        return True
+    except Exception as e:
+        logger.error(f"Error occurred while collecting {device['hostname']}: {str(e)}")
+        return False
+    finally:
+        close_connection(conn)
+
+def load_timings(input_file):
+    """Returns the most recent duration per IP address from the timings file."""
+    timings = {}
+    if not os.path.exists(input_file):
+        return timings
+    with open(input_file, 'r', newline='') as file:
+        for row in csv.DictReader(file):
+            timings[row["ip_address"]] = row
+    return timings
+
+def upgrade_header(output_file, fieldnames):
+    """Rewrites a CSV file with a header of new columns, the old rows get empty values."""
+    with open(output_file, 'r', newline='') as file:
+        reader = csv.DictReader(file)
+        if not reader.fieldnames or reader.fieldnames == fieldnames:
+            return
+        rows = list(reader)
+    temp_file = output_file + '.tmp'
+    with open(temp_file, 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=fieldnames, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(temp_file, output_file)
+
+def append_rows(output_file, fieldnames, rows):
+    """Appends rows to a CSV file, writing the header for a new file."""
+    new_file = not os.path.exists(output_file)
+    if not new_file:
+        upgrade_header(output_file, fieldnames)
+    with open(output_file, 'a', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=fieldnames)
+        if new_file:
+            writer.writeheader()
+        writer.writerows(rows)
+
+def duration_estimates(timings):
+    """Returns the median duration per type and per platform, and over all devices."""
+    groups = {}
+    for row in timings.values():
+        for key in ("type", "platform"):
+            if row.get(key):
+                groups.setdefault((key, row[key]), []).append(float(row["duration"]))
+    estimates = {group: statistics.median(durations) for group, durations in groups.items()}
+    overall = statistics.median(float(row["duration"]) for row in timings.values()) if timings else DEFAULT_DURATION
+    return estimates, overall
+
+def expected_duration(device, timings, estimates, overall):
+    """Returns the expected duration of a device.
+
+    Known devices use their last duration. Unknown devices get the median duration of
+    the devices with the same type, then the same platform, then of all devices.
+    """
+    known = timings.get(device["ip_address"])
+    if known:
+        return float(known["duration"])
+    for key in ("type", "platform"):
+        if (key, device.get(key)) in estimates:
+            return estimates[(key, device.get(key))]
+    return overall
+
+def order_devices(devices, timings):
+    """Orders the devices longest expected duration first, so slow devices do not finish last."""
+    estimates, overall = duration_estimates(timings)
+    return sorted(devices, key=lambda device: expected_duration(device, timings, estimates, overall), reverse=True)
+
+def timed_collect(device, commands, pipeline=None):
+    """Collects one device and returns its timing row, or None when the collection failed.
+
+    A failed login or timeout says nothing about how long the device takes, so the
+    device keeps the duration of its last successful run in the timings file.
+    """
+    start = time.perf_counter()
+    collected = collect_device(device, commands, pipeline)
+    duration = round(time.perf_counter() - start, 2)
+    log_event(logger, "device", device=device.get("hostname") or device["ip_address"], duration=duration,
+              status="ok" if collected else "error")
+    if not collected:
+        return None
+    return {
+        "date": date,
+        "ip_address": device["ip_address"],
+        "hostname": device.get("hostname", ""),
+        "platform": device.get("platform", ""),
+        "type": device.get("type", ""),
+        "duration": duration,
+    }
+
+def collect_devices(devices, commands, workers=MAX_WORKERS, pipeline=None):
+    """Collects the devices with a pool of workers, longest expected duration first, and records the timings."""
+    devices = order_devices(devices, load_timings(timings_file))
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = list(executor.map(lambda device: timed_collect(device, commands, pipeline), devices))
+    wall_time = round(time.perf_counter() - start, 2)
+    timings = [timing for timing in results if timing is not None]
+
+    if pipeline:
+        pipeline.close()
+        print(f"Reports {version_report_file} and {mac_report_file} written {time.perf_counter() - start - wall_time:.2f} seconds after the collection.")
+
+    if os.path.isdir(snapshot_directory):
+        write_snapshot_manifest(snapshot_directory)
+    append_rows(timings_file, TIMING_FIELDS, timings)
+    logins = login_limiter.stats()
+    append_rows(run_timings_file, RUN_TIMING_FIELDS, [{
+        "date": date,
+        "devices": len(devices),
+        "workers": workers,
+        "wall_time": wall_time,
+        "device_time": round(sum(timing["duration"] for timing in timings), 2),
+        **logins,
+    }])
+    print(f"{len(timings)} of {len(devices)} devices collected in {wall_time} seconds with {workers} workers.")
+    print(f"{logins['logins']} logins, {logins['login_retries']} retries, {logins['login_wait']} seconds waited on the login rate limit.")
+    log_event(logger, "run", duration=wall_time)
+    if flush_logging():
+        print_summary(summarize(read_records(run=RUN_ID)))
+    return timings
+
+def main(argv=None):
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Execute the commands on the devices and save the output.")
+    parser.add_argument("--hosts", default=csv_file, help="CSV file with the device details")
+    parser.add_argument("--commands", default=commands_csv_file, help="CSV file with the commands")
+    parser.add_argument("--workers", type=int, default=MAX_WORKERS, help="number of devices collected at the same time")
+    parser.add_argument("--shard", help="only collect shard i of N, given as i/N")
+    parser.add_argument("--transport", choices=SYNC_TRANSPORTS, help="SSH transport of this run, overrides SSH_TRANSPORT")
+    parser.add_argument("--pipeline", action="store_true", help="parse the outputs into the reports while collecting")
+    parser.add_argument("--parsers", type=int, default=PARSER_WORKERS, help="number of parser processes in pipeline mode")
+    args = parser.parse_args(argv)
+    setup_logging()
+
+    if args.transport:
+        set_transport(args.transport)
+
+    # Check if all required environment variables are set
+    if not check_environment():
+        exit(1)
+
+    shard = parse_shard(args.shard) if args.shard else None
+    if shard:
+        # Each node writes its own partial snapshot
+        global snapshot_directory
+        snapshot_directory = f"output_{date}_shard{shard[0]}of{shard[1]}"
+
+    devices = load_devices(args.hosts, shard)
+    commands = load_commands(args.commands)
+
+    pipeline = Pipeline(args.parsers) if args.pipeline else None
+    collect_devices(devices, commands, args.workers, pipeline)
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,12 @@
 # created by Alexander Deca - Deca Consulting 06/07/2023
 # please note there is a requirements file -> pip install -r requirements.txt
 # csv outout file format : File,Hostname,Platform,Software Version,Software Image
+# usage : python SaveVersion.py --directory output_2023-10-29 --output SaveVersion.csv
 
 import os
 import csv
 import logging
-from ntc_templates.parse import parse_output
+import argparse
 
 # Set up logging configuration
 logging.basicConfig(filename='error.log', level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -15,7 +16,8 @@ logger = logging.getLogger(__name__)
 
 def parse_cisco_show_output(output):
     try:
-        # Parse the show command output using ntc-templates
+        # Parse the show command output using ntc-templates, imported on first use
+        from ntc_templates.parse import parse_output
         result = parse_output(platform="cisco_ios", command="show version", data=output)
         logger.info('Parsed Cisco show command output successfully.')
 
@@ -65,5 +67,15 @@ directory_path = "output_2023-10-29"
 # Specify the output CSV file path
 output_csv_file = "SaveVersion.csv"
 
-# Review the directory and save the output in CSV format
-review_directory(directory_path, output_csv_file)
\ No newline at end of file
+def main(argv=None):
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Collect the software versions of a snapshot in one CSV file.")
+    parser.add_argument("--directory", default=directory_path, help="directory with the show command outputs")
+    parser.add_argument("--output", default=output_csv_file, help="output CSV file")
+    args = parser.parse_args(argv)
+
+    # Review the directory and save the output in CSV format
+    review_directory(args.directory, args.output)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+
+# created by Alexander Deca - Deca Consulting 06/07/2023
+# please note there is a requirements file -> pip install -r requirements.txt
+# this module generates synthetic but realistic show command outputs for benchmarks:
+# show version, show mac address-table (IOS/IOS-XE and NX-OS), show cdp neighbors,
+# show interface status, show etherchannel summary and show running-config,
+# for a fleet of core switches, access switches and routers.
+# The outputs are reproducible for a seed. Run as a script it writes a snapshot tree
+# like SaveInfo.py, with a hosts CSV file, so the other scripts can be run on it.
+# usage : python SyntheticCorpus.py --devices 100 --mac-lines 1000 --config-lines 2000 --directory output_synthetic
+
+import os
+import csv
+import random
+import argparse
+
+IOS_TEMPLATE = """          Mac Address Table
+-------------------------------------------
+
+Vlan    Mac Address       Type        Ports
+----    -----------       --------    -----
+ All    0100.0ccc.cccc    STATIC      CPU
+ All    0100.0ccc.cccd    STATIC      CPU
+{rows}Total Mac Addresses for this criterion: {count}
+"""
+
+NXOS_TEMPLATE = """Legend:
+        * - primary entry, G - Gateway MAC, (R) - Routed MAC, O - Overlay MAC
+        age - seconds since last seen,+ - primary entry using vPC Peer-Link,
+        (T) - True, (F) - False, C - ControlPlane MAC, ~ - vsan
+   VLAN     MAC Address      Type      age     Secure NTFY Ports
+---------+-----------------+--------+---------+------+----+------------------
+G    -     0022.bdf8.19ff   static   -         F      F    sup-eth1(R)
+{rows}"""
+
+VERSION_TEMPLATE = """Cisco IOS XE Software, Version {version}
+Cisco IOS Software [Gibraltar], {family} Software ({image}), Version {version}, RELEASE SOFTWARE (fc5)
+Technical Support: http://www.cisco.com/techsupport
+Copyright (c) 1986-2020 by Cisco Systems, Inc.
+Compiled Thu 09-Jul-20 21:49 by mcpre
+
+ROM: IOS-XE ROMMON
+BOOTLDR: System Bootstrap, Version 16.12.2r, RELEASE SOFTWARE (P)
+
+{hostname} uptime is {weeks} weeks, {days} days, 4 hours, 5 minutes
+Uptime for this control processor is {weeks} weeks, {days} days, 4 hours, 7 minutes
+System returned to ROM by Reload Command
+System image file is "flash:packages.conf"
+Last reload reason: Reload Command
+
+cisco {model} (X86) processor with 1392780K/6147K bytes of memory.
+Processor board ID {serial}
+Configuration register is 0x102
+
+"""
+
+CDP_HEADER = """Capability Codes: R - Router, T - Trans Bridge, B - Source Route Bridge
+                  S - Switch, H - Host, I - IGMP, r - Repeater, P - Phone,
+                  D - Remote, C - CVTA, M - Two-port Mac Relay
+
+Device ID        Local Intrfce     Holdtme    Capability  Platform  Port ID
+"""
+
+STATUS_HEADER = """
+Port         Name               Status       Vlan       Duplex  Speed Type
+"""
+
+ETHERCHANNEL_HEADER = """Flags:  D - down        P - bundled in port-channel
+        I - stand-alone s - suspended
+        U - in use      f - failed to allocate aggregator
+
+Number of channel-groups in use: 2
+Number of aggregators:           2
+
+Group  Port-channel  Protocol    Ports
+------+-------------+-----------+-----------------------------------------------
+"""
+
+# Status of an access port -> weight
+PORT_STATUSES = {"connected": 60, "notconnect": 30, "disabled": 7, "err-disabled": 3}
+
+# Role -> (device type in the hosts file and CDP platform, show version model, image, capability)
+ROLES = {
+    "core": ("C9300-24S", "C9300-24S", "CAT9K_IOSXE", "R S I"),
+    "access": ("C9300L-48", "C9300L-48P-4X", "CAT9K_IOSXE", "S I"),
+    "router": ("ISR4331-B", "ISR4331/K9", "X86_64_LINUX_IOSD-UNIVERSALK9-M", "R I"),
+}
+
+VERSIONS = ["16.12.4", "16.12.5", "17.3.4a", "17.6.3", "17.9.4"]
+
+def random_mac(rng):
+    """Returns a random MAC address in Cisco notation."""
+    digits = "%012x" % rng.getrandbits(48)
+    return f"{digits[0:4]}.{digits[4:8]}.{digits[8:12]}"
+
+def generate_ios_table(lines, seed=1):
+    """Generates an IOS/IOS-XE show mac address-table output with the given number of entries."""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(lines):
+        vlan = rng.randint(1, 4094)
+        mac_type = rng.choice(["DYNAMIC", "DYNAMIC", "DYNAMIC", "STATIC"])
+        port = rng.choice([f"Gi{rng.randint(1, 8)}/0/{rng.randint(1, 48)}", f"Te1/1/{rng.randint(1, 8)}", f"Po{rng.randint(1, 16)}"])
+        rows.append(f"{vlan:>4}    {random_mac(rng)}    {mac_type:<11} {port}\n")
+    return IOS_TEMPLATE.format(rows="".join(rows), count=lines + 2)
+
+def generate_nxos_table(lines, seed=1):
+    """Generates an NX-OS show mac address-table output with the given number of entries."""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(lines):
+        flag = rng.choice(["*", "+", " "])
+        vlan = rng.randint(1, 4094)
+        port = rng.choice([f"Eth1/{rng.randint(1, 48)}", f"Po{rng.randint(1, 16)}", "vPC Peer-Link"])
+        rows.append(f"{flag} {vlan:>4}     {random_mac(rng)}   dynamic  {rng.randint(0, 300):<9} F      F    {port}\n")
+    return NXOS_TEMPLATE.format(rows="".join(rows))
+
+def generate_show_version(device, seed=1):
+    """Generates an IOS-XE show version output for a device of the fleet."""
+    rng = random.Random(f"{seed}-{device['hostname']}")
+    _, model, image, _ = ROLES[device["role"]]
+    return VERSION_TEMPLATE.format(
+        hostname=device["hostname"], model=model, image=image, version=rng.choice(VERSIONS),
+        family="Catalyst L3 Switch" if device["role"] != "router" else "ISR",
+        weeks=rng.randint(1, 52), days=rng.randint(0, 6), serial=f"FOC{rng.randint(1000, 9999)}X{rng.randint(100, 999)}",
+    )
+
+def generate_cdp_neighbors(neighbors):
+    """Generates an IOS show cdp neighbors output from (local interface, remote device, remote interface) tuples."""
+    lines = [CDP_HEADER]
+    for local_interface, remote, remote_interface in neighbors:
+        platform, _, _, capability = ROLES[remote["role"]]
+        device_id = remote["hostname"]
+        if len(device_id) > 16:
+            # IOS puts a long device id on its own line
+            lines.append(device_id + "\n")
+            device_id = ""
+        lines.append(f"{device_id:<17}{local_interface:<18}{160:<17}{capability:<6}{platform:<10}{remote_interface}\n")
+    lines.append(f"\nTotal cdp entries displayed : {len(neighbors)}\n")
+    return "".join(lines)
+
+def short_interface(interface):
+    """Returns the short interface name used by show interface status, e.g. 'Ten 1/1/1' becomes 'Te1/1/1'."""
+    prefix, number = interface.split(" ", 1)
+    return prefix[:2] + number
+
+def generate_interface_status(device, neighbors, ports=48, seed=1):
+    """Generates an IOS show interface status output with ports access ports and the uplinks of the neighbors."""
+    rng = random.Random(f"{seed}-{device['hostname']}-status")
+    vlans = rng.sample(range(10, 4000), 8)
+    statuses = rng.choices(list(PORT_STATUSES), weights=list(PORT_STATUSES.values()), k=ports)
+    lines = [STATUS_HEADER]
+    for number, status in enumerate(statuses):
+        port = f"Gi{1 + number // 48}/0/{number % 48 + 1}"
+        name = "user port" if status == "connected" else ""
+        speed = ("a-full", "a-1000") if status == "connected" else ("auto", "auto")
+        lines.append(f"{port:<13}{name:<19}{status:<13}{rng.choice(vlans):<11}{speed[0]:>6} {speed[1]:>6} 10/100/1000BaseTX\n")
+    for local_interface, remote, _ in neighbors:
+        port = short_interface(local_interface)
+        lines.append(f"{port:<13}{'uplink ' + remote['hostname']:<19.18}{'connected':<13}{'trunk':<11}{'full':>6} {'10G':>6} SFP-10GBase-SR\n")
+    if neighbors and device["role"] == "access":
+        lines.append(f"{'Po1':<13}{'uplinks':<19}{'connected':<13}{'trunk':<11}{'a-full':>6} {'a-10G':>6} N/A\n")
+    return "".join(lines)
+
+def generate_etherchannel(neighbors):
+    """Generates an IOS show etherchannel summary output with the uplinks of an access switch in Po1, and an unused Po2."""
+    members = " ".join(f"{short_interface(local_interface)}(P)" for local_interface, _, _ in neighbors)
+    return ETHERCHANNEL_HEADER + f"1      Po1(SU)         LACP      {members}\n" + "2      Po2(SD)         LACP      \n"
+
+def generate_running_config(hostname, lines, seed=1):
+    """Generates an IOS-XE show running-config output of about the given number of lines."""
+    rng = random.Random(f"{seed}-{hostname}")
+    config = ["Building configuration...", "", "Current configuration : 0 bytes", "!", "version 17.6",
+              "service timestamps debug datetime msec", "service timestamps log datetime msec", "service password-encryption",
+              "!", f"hostname {hostname}", "!", "aaa new-model", "aaa authentication login default group tacacs+ local", "!"]
+    vlans = sorted(rng.sample(range(2, 4094), 20))
+    for vlan in vlans:
+        config += [f"vlan {vlan}", f" name VLAN{vlan}", "!"]
+    port = 0
+    while len(config) < lines - 10:
+        port += 1
+        interface = f"GigabitEthernet{1 + (port - 1) // 48}/0/{(port - 1) % 48 + 1}"
+        config += [f"interface {interface}", f" description user port {port}", " switchport mode access",
+                   f" switchport access vlan {rng.choice(vlans)}", " spanning-tree portfast", " spanning-tree bpduguard enable", "!"]
+    config += ["line con 0", " logging synchronous", "line vty 0 15", " transport input ssh", "!", "end", ""]
+    return "\n".join(config)
+
+def generate_fleet(devices, seed=1):
+    """Generates a fleet of core switches, access switches with two uplinks to the cores, and routers.
+
+    Returns the devices as hosts CSV rows with a role, and the CDP neighbors per hostname.
+    """
+    rng = random.Random(seed)
+    core_count = max(2, devices // 50)
+    router_count = max(1, devices // 200) if devices > core_count + 1 else 0
+    access_count = max(0, devices - core_count - router_count)
+    fleet = (
+        [{"hostname": f"core{i + 1:02d}", "role": "core"} for i in range(core_count)]
+        + [{"hostname": f"rtr{i + 1:02d}", "role": "router"} for i in range(router_count)]
+        + [{"hostname": f"acc-{i + 1:04d}", "role": "access"} for i in range(access_count)]
+    )
+    for index, device in enumerate(fleet):
+        device["ip_address"] = f"10.{index // 65536}.{index // 256 % 256}.{index % 256}"
+        device["platform"] = "iosxe"
+        device["type"] = ROLES[device["role"]][0]
+
+    neighbors = {device["hostname"]: [] for device in fleet}
+    ports = {device["hostname"]: 0 for device in fleet}
+
+    def core_port(core):
+        ports[core["hostname"]] += 1
+        number = ports[core["hostname"]]
+        return f"Ten {1 + (number - 1) // 48}/0/{(number - 1) % 48 + 1}"
+
+    def connect(a, a_interface, b, b_interface):
+        neighbors[a["hostname"]].append((a_interface, b, b_interface))
+        neighbors[b["hostname"]].append((b_interface, a, a_interface))
+
+    cores = fleet[:core_count]
+    # Ring between the cores, a single link for two cores
+    for i in range(core_count if core_count > 2 else core_count - 1):
+        neighbor = cores[(i + 1) % core_count]
+        connect(cores[i], core_port(cores[i]), neighbor, core_port(neighbor))
+    for router in fleet[core_count:core_count + router_count]:
+        for uplink, core in enumerate(rng.sample(cores, 2)):
+            connect(router, f"Gig 0/0/{uplink}", core, core_port(core))
+    for access in fleet[core_count + router_count:]:
+        for uplink, core in enumerate(rng.sample(cores, 2)):
+            connect(access, f"Ten 1/1/{uplink + 1}", core, core_port(core))
+    return fleet, neighbors
+
+def write_corpus(directory, hosts_file, devices, mac_lines, config_lines, seed=1):
+    """Writes the outputs of a generated fleet in a snapshot tree and the hosts CSV file, returns the fleet."""
+    fleet, neighbors = generate_fleet(devices, seed)
+    for device in fleet:
+        output_directory = os.path.join(directory, f"{device['hostname']}_output")
+        os.makedirs(output_directory, exist_ok=True)
+        outputs = {
+            "show_version.txt": generate_show_version(device, seed),
+            "show_cdp_neighbor.txt": generate_cdp_neighbors(neighbors[device["hostname"]]),
+            "show_running-config.txt": generate_running_config(device["hostname"], config_lines, seed),
+        }
+        if device["role"] != "router":
+            outputs["show_interface_status.txt"] = generate_interface_status(device, neighbors[device["hostname"]], seed=seed)
+            if device["role"] == "access":
+                outputs["show_etherchannel_summary.txt"] = generate_etherchannel(neighbors[device["hostname"]])
+            outputs["show_mac_address-table.txt"] = generate_ios_table(mac_lines, seed=f"{seed}-{device['hostname']}")
+        for file_name, output in outputs.items():
+            with open(os.path.join(output_directory, file_name), "w") as f:
+                f.write(output)
+
+    with open(hosts_file, "w", newline="") as file:
+        writer = csv.DictWriter(file, fieldnames=["ip_address", "hostname", "platform", "type"], extrasaction="ignore")
+        writer.writeheader()
+        writer.writerows(fleet)
+    return fleet
+
+def main():
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Write a synthetic snapshot of show command outputs.")
+    parser.add_argument("--devices", type=int, default=100, help="number of devices, 10 to 5000")
+    parser.add_argument("--mac-lines", type=int, default=1000, help="number of entries per MAC address table")
+    parser.add_argument("--config-lines", type=int, default=2000, help="number of lines per running configuration")
+    parser.add_argument("--directory", default="output_synthetic", help="snapshot directory to write")
+    parser.add_argument("--hosts", default="hosts_synthetic.csv", help="hosts CSV file to write")
+    parser.add_argument("--seed", type=int, default=1, help="seed of the generator")
+    args = parser.parse_args()
+
+    fleet = write_corpus(args.directory, args.hosts, args.devices, args.mac_lines, args.config_lines, args.seed)
+    print(f"{len(fleet)} devices written in {args.directory}, hosts in {args.hosts}.")
+
+if __name__ == "__main__":
+    main()
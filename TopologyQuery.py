@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+
+# created by Alexander Deca - Deca Consulting 06/07/2023
+# please note there is a requirements file -> pip install -r requirements.txt
+# this script answers path and blast radius questions on the topology saved by GetDevicesv6.py.
+# An index is precomputed once per topology and cached next to it: the links with their
+# interfaces, the articulation points and bridges (single points of failure) and per node
+# the devices downstream of it, that lose every path to the core switches (cswitch) when
+# it fails. Shortest paths are computed on the cached adjacency and stored in the index too.
+# The index only holds plain Python objects, so a query does not import networkx.
+# usage : python TopologyQuery.py --topology brugge_topology.pickle --downstream core01
+#         python TopologyQuery.py --path acc-0001 acc-0002, python TopologyQuery.py --critical
+
+import os
+import pickle
+import logging
+import argparse
+from collections import deque
+from Locate import normalize_interface
+
+logging.basicConfig(filename='error.log', level=logging.ERROR, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Specify the topology saved by GetDevicesv6.py
+topology_file = "brugge_topology.pickle"
+
+# The index is saved as <topology>_index.pickle
+INDEX_SUFFIX = "_index.pickle"
+
+# Node class of the core switches, the root of the downstream sets
+CORE_CLASS = "cswitch"
+
+# Maximum number of shortest paths kept in the index
+PATH_CACHE_SIZE = 100000
+
+def index_file_for(topology):
+    """Returns the index file of a topology file."""
+    return os.path.splitext(topology)[0] + INDEX_SUFFIX
+
+def load_topology(input_file):
+    """Loads the topology graph saved by GetDevicesv6.py."""
+    with open(input_file, "rb") as file:
+        return pickle.load(file)
+
+def edge_interfaces(u, v, key, data):
+    """Returns the interfaces of u and v of a topology edge."""
+    if "local_device" in data:
+        local_device = data["local_device"]
+    else:
+        # Older topologies have no local_device, the key holds the (host, interface) pairs
+        local_device = u if dict(key).get(u) == data["local_interface"] else v
+    if local_device == u:
+        return data["local_interface"], data["remote_interface"]
+    return data["remote_interface"], data["local_interface"]
+
+def downstream_sets(graph, cores):
+    """Returns the devices that lose every path to the cores per node, and the nodes without a path to a core.
+
+    A virtual root is connected to all cores; in the dominator tree from that root the
+    descendants of a node are exactly the nodes whose paths to the cores all pass through it.
+    """
+    import networkx as nx
+    root = object()
+    directed = graph.to_directed()
+    directed.add_edges_from((root, core) for core in cores)
+    idom = nx.immediate_dominators(directed, root)
+
+    children = {}
+    for node, parent in idom.items():
+        if node is not root:
+            children.setdefault(parent, []).append(node)
+
+    # Breadth first order of the dominator tree, the descendants are collected bottom up
+    order = []
+    queue = deque([root])
+    while queue:
+        node = queue.popleft()
+        order.append(node)
+        queue.extend(children.get(node, []))
+    descendants = {}
+    for node in reversed(order[1:]):
+        below = set()
+        for child in children.get(node, []):
+            below.add(child)
+            below |= descendants.get(child, set())
+        if below:
+            descendants[node] = below
+
+    downstream = {node: sorted(below) for node, below in descendants.items()}
+    unreachable = sorted(node for node in graph if node not in idom)
+    return downstream, unreachable
+
+def build_index(topology, topology_path=""):
+    """Precomputes the links, adjacency, articulation points, bridges and downstream sets of a topology."""
+    import networkx as nx
+    links = {}
+    for u, v, key, data in topology.edges(keys=True, data=True):
+        if u == v:
+            continue
+        u_interface, v_interface = edge_interfaces(u, v, key, data)
+        # Both devices report the link, with long or short interface names
+        pair = (normalize_interface(u_interface), normalize_interface(v_interface))
+        if u > v:
+            u, v, pair = v, u, pair[::-1]
+        if pair not in links.setdefault((u, v), []):
+            links[(u, v)].append(pair)
+
+    graph = nx.Graph()
+    graph.add_nodes_from(topology)
+    graph.add_edges_from(links)
+    cores = [node for node, image in topology.nodes(data="image") if image == CORE_CLASS]
+    if not cores:
+        logger.error(f"No {CORE_CLASS} nodes in {topology_path}, the downstream sets are empty")
+    downstream, unreachable = downstream_sets(graph, cores) if cores else ({}, sorted(graph))
+
+    # A link between two devices with parallel links is not a single point of failure
+    bridges = sorted(tuple(sorted(edge)) for edge in nx.bridges(graph) if len(links[tuple(sorted(edge))]) == 1)
+    return {
+        "topology": topology_path,
+        "nodes": dict(topology.nodes(data="image")),
+        "cores": sorted(cores),
+        "adjacency": {node: sorted(graph[node]) for node in graph},
+        "links": links,
+        "articulation_points": sorted(nx.articulation_points(graph)),
+        "bridges": bridges,
+        "downstream": downstream,
+        "unreachable": unreachable,
+        "paths": {},
+    }
+
+def save_index(index, output_file):
+    """Saves the index next to the topology."""
+    with open(output_file + ".tmp", "wb") as file:
+        pickle.dump(index, file, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(output_file + ".tmp", output_file)
+
+def load_index(input_file):
+    """Loads an index saved by save_index."""
+    with open(input_file, "rb") as file:
+        return pickle.load(file)
+
+def get_index(topology, cached_file, rebuild=False):
+    """Returns the saved index, rebuilding it when the topology is newer."""
+    if not rebuild and os.path.exists(cached_file) and os.path.getmtime(cached_file) >= os.path.getmtime(topology):
+        return load_index(cached_file)
+    index = build_index(load_topology(topology), topology)
+    save_index(index, cached_file)
+    return index
+
+def node_name(index, name):
+    """Returns the node of a hostname, the domain is stripped like GetDevicesv6.py does."""
+    node = name.split(".")[0].lower()
+    if node not in index["adjacency"]:
+        raise KeyError(f"{name} is not in the topology")
+    return node
+
+def shortest_path(index, source, target):
+    """Returns the shortest path between two nodes from the cache or with a breadth first search, None when not connected."""
+    key = (source, target) if source <= target else (target, source)
+    if key in index["paths"]:
+        path = index["paths"][key]
+        return path if path is None or path[0] == source else path[::-1]
+
+    adjacency = index["adjacency"]
+    parents = {source: None}
+    queue = deque([source])
+    while queue and target not in parents:
+        node = queue.popleft()
+        for neighbor in adjacency[node]:
+            if neighbor not in parents:
+                parents[neighbor] = node
+                queue.append(neighbor)
+    path = None
+    if target in parents:
+        path = [target]
+        while parents[path[-1]] is not None:
+            path.append(parents[path[-1]])
+        path.reverse()
+
+    if len(index["paths"]) < PATH_CACHE_SIZE:
+        index["paths"][key] = path if path is None or source <= target else path[::-1]
+    return path
+
+def path_hops(index, path):
+    """Returns the (device, interfaces, next device, next interfaces) hops of a path."""
+    hops = []
+    for u, v in zip(path, path[1:]):
+        pairs = index["links"][(u, v) if u < v else (v, u)]
+        if u > v:
+            pairs = [pair[::-1] for pair in pairs]
+        hops.append((u, ", ".join(pair[0] for pair in pairs), v, ", ".join(pair[1] for pair in pairs)))
+    return hops
+
+def print_critical(index):
+    """Prints the articulation points with the number of downstream devices, and the bridges."""
+    print(f"{len(index['articulation_points'])} articulation points:")
+    for node in sorted(index["articulation_points"], key=lambda node: -len(index["downstream"].get(node, []))):
+        print(f"  {node:<30} {len(index['downstream'].get(node, [])):>6} devices downstream")
+    print(f"{len(index['bridges'])} bridges:")
+    for u, v in index["bridges"]:
+        pair = index["links"][(u, v)][0]
+        print(f"  {u} {pair[0]} - {pair[1]} {v}")
+    if index["unreachable"]:
+        print(f"{len(index['unreachable'])} devices without a path to a core: {', '.join(index['unreachable'])}")
+
+def main(argv=None):
+    """Main execution function."""
+    parser = argparse.ArgumentParser(description="Query the paths and the downstream devices of the saved topology.")
+    parser.add_argument("--topology", default=topology_file, help="topology saved by GetDevicesv6.py")
+    parser.add_argument("--downstream", metavar="DEVICE", help="show the devices that depend on this device to reach the core")
+    parser.add_argument("--path", nargs=2, metavar=("FROM", "TO"), help="show the shortest path with the interfaces")
+    parser.add_argument("--critical", action="store_true", help="show the articulation points and bridges")
+    parser.add_argument("--rebuild", action="store_true", help="rebuild the index even if it is up to date")
+    args = parser.parse_args(argv)
+
+    cached_file = index_file_for(args.topology)
+    try:
+        index = get_index(args.topology, cached_file, rebuild=args.rebuild)
+    except Exception as e:
+        logger.error(f"Failed to build the topology index of {args.topology}: {e}")
+        print(f"Failed to build the topology index of {args.topology}, see error.log.")
+        return
+
+    try:
+        if args.downstream:
+            node = node_name(index, args.downstream)
+            downstream = index["downstream"].get(node, [])
+            print(f"{len(downstream)} devices downstream of {node}:")
+            for device in downstream:
+                print(f"  {device}")
+        if args.path:
+            source, target = (node_name(index, name) for name in args.path)
+            cached = len(index["paths"])
+            path = shortest_path(index, source, target)
+            if path is None:
+                print(f"No path between {source} and {target}.")
+            else:
+                print(f"{len(path) - 1} hops from {source} to {target}:")
+                for u, u_interfaces, v, v_interfaces in path_hops(index, path):
+                    print(f"  {u} {u_interfaces} -> {v_interfaces} {v}")
+            if len(index["paths"]) != cached:
+                save_index(index, cached_file)
+        if args.critical or not (args.downstream or args.path):
+            print_critical(index)
+    except KeyError as e:
+        print(e.args[0])
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+# created by Alexander Deca - Deca Consulting 06/07/2023
+# please note there is a requirements file -> pip install -r requirements.txt
+# this script is the single entry point for the scripts of this repository.
+# Only the script of the chosen subcommand is imported, and the scripts import
+# their heavy libraries (scrapli, ntc_templates, networkx, pyvis, manuf) on first use,
+# so --help and small runs start fast. Use BenchStartup.py to measure the cold start.
+# usage : python netaudit.py <subcommand> [options], python netaudit.py <subcommand> --help
+
+import sys
+import argparse
+import importlib
+
+# Subcommand -> (script module, description)
+SUBCOMMANDS = {
+    "collect": ("SaveInfo", "execute the show commands on the devices and save the output"),
+    "hostnames": ("GetHostnames", "update the hostnames in the hosts CSV file"),
+    "topology": ("GetDevicesv6", "build the network topology from the CDP neighbors"),
+    "versions": ("SaveVersion", "collect the software versions of a snapshot"),
+    "macs": ("MacLookup", "collect the MAC address tables of a snapshot"),
+    "diff": ("RunDiff", "diff the files of two snapshots"),
+    "push": ("ConfDevice", "roll out configuration commands in waves"),
+    "logs": ("LogAnalytics", "rank the MAC flap, BPDU guard, err-disable and link flap events"),
+    "ports": ("PortInventory", "count the used, free and err-disabled ports per switch, model and VLAN"),
+    "prune": ("Retention", "delete the expired snapshots, keeping the changed running configs"),
+    "query": ("TopologyQuery", "show the paths, downstream devices and single points of failure of the topology"),
+}
+
+def build_parser():
+    """Returns the parser of the subcommand, the options are parsed by the script itself."""
+    epilog = "subcommands:\n" + "\n".join(f"  {name:<12}{description}" for name, (_, description) in SUBCOMMANDS.items())
+    parser = argparse.ArgumentParser(
+        prog="netaudit",
+        description="Network audit scripts.",
+        epilog=epilog,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("subcommand", choices=SUBCOMMANDS, metavar="subcommand", help="one of " + ", ".join(SUBCOMMANDS))
+    parser.add_argument("arguments", nargs=argparse.REMAINDER, help="options of the subcommand, see <subcommand> --help")
+    return parser
+
+def main(argv=None):
+    """Main execution function."""
+    args = build_parser().parse_args(argv)
+    module_name = SUBCOMMANDS[args.subcommand][0]
+
+    # The usage of the script shows the subcommand instead of the script name
+    sys.argv[0] = f"netaudit {args.subcommand}"
+    module = importlib.import_module(module_name)
+    module.main(args.arguments)
+
+if __name__ == "__main__":
+    main()